@@ -1,11 +1,17 @@
 from . import agc
 from . import bitgen
+from . import cic
+from . import ddc
 from . import fft
+from . import fileio
+from . import fixedpt
 from . import fir
 from . import intdump
+from . import linksim
 from . import misc
 from . import movavg
 from . import noisegen
 from . import pictrl
 from . import qtrratedwncvt
+from . import rng
 from . import sinc
\ No newline at end of file
@@ -1,13 +1,19 @@
 from .agc import *
 from .bitgen import *
+from .cic import *
+from .ddc import *
 from .fft import *
+from .fileio import *
+from .fixedpt import *
 from .fir import *
 from .intdump import *
+from .linksim import *
 from .movavg import *
 from .misc import *
 from .noisegen import *
 from .pictrl import *
 from .qtrratedwncvt import *
+from .rng import *
 from .sinc import *
 
 
@@ -5,26 +5,41 @@ class AGC:
     Designer:       Andrew Carroll
 
     Description:    Implements Automatic Gain Control algorithm. Calculates
-                    standard deviation of input and sets gain to target
-                    probability of numSigma samples lie within +/- fullScale.
-                    Clamps output at +/- fullScale. 
+                    standard deviation of each bufLength input samples
+                    (running Welford estimate, no sample buffer) and sets
+                    gain to target probability of numSigma samples lie
+                    within +/- fullScale. Clamps output at +/- fullScale.
     
     Attributes:     bufLength:  # of samples used to calc new gain value
                     fullScale:  Output full scale (assumes +/-)
                     numSigma:   (*optional) # of std dev to fall within +/- 
                                     fullScale. Default = 2 (95%).
+                    inFmt:      (*optional) FixedPt input format.
+                                    Default = None
+                    outFmt:     (*optional) FixedPt output format. Replaces
+                                    the +/- fullScale clamp with rounding and
+                                    saturation to an integer word.
+                                    Default = None (floating point)
     
     Methods:        update(samp):   Update AGC object with new sample
                     clear():        Clear buffer and gain
                     calc(data):     Apply AGC to data array
+                    process(data):  Apply AGC to data block, keeping gain
+                                        and partial buffer between calls
     """
 
-    def __init__(self,bufLength,fullScale,numSigma=2):
+    def __init__(self,bufLength,fullScale,numSigma=2,inFmt=None,outFmt=None):
         self.numSigma = numSigma
         self.fullScale = fullScale
-        self.buf = np.zeros(bufLength)
+        self.inFmt = inFmt
+        self.outFmt = outFmt
+        self.bufLength = bufLength
         self.bufCnt = 0
         self.gain = 1
+        # Welford running mean and sum of squared deviations of the samples
+        # in the current buffer
+        self.__mean = 0.0
+        self.__m2 = 0.0
 
     def update(self,samp):
         """
@@ -34,13 +49,20 @@ class AGC:
         
         Returns:        sampOut:    Output sample with gain applied
         """
-        self.buf = np.roll(self.buf,1)
-        self.buf[0] = samp
-        if (self.bufCnt == self.buf.size-1):
-            self.gain = self.fullScale/(np.std(self.buf)*self.numSigma)
+        if (self.inFmt is not None):
+            samp = self.inFmt.quantize(samp)
+        self.bufCnt += 1
+        delta = samp - self.__mean
+        self.__mean += delta/self.bufCnt
+        self.__m2 += delta*(samp - self.__mean)
+        if (self.bufCnt == self.bufLength):
+            self.gain = self.fullScale/(np.sqrt(self.__m2/self.bufLength)*
+                                        self.numSigma)
             self.bufCnt = 0
-        else:
-            self.bufCnt += 1
+            self.__mean = 0.0
+            self.__m2 = 0.0
+        if (self.outFmt is not None):
+            return self.outFmt.quantize(samp*self.gain)
         sampOut = np.clip(samp*self.gain,-self.fullScale,self.fullScale)
         return sampOut
 
@@ -53,30 +75,78 @@ class AGC:
         Returns:        None
         """
         self.bufCnt = 0
-        self.buf = np.zeros(self.buf.size)
+        self.__mean = 0.0
+        self.__m2 = 0.0
         self.gain = 1
 
     def calc(self,data):
         """
-        Description:    Apply AGC to data array
+        Description:    Apply AGC to data array. Clears AGC prior to
+                            processing.
     
         Params:         data:       Input data array
         
         Returns:        dataOut:    Output data with gain applied
         """
-        dataOut = np.zeros(data.size)
         self.clear()
-        for ii in range(0,data.size):
-            self.buf = np.roll(self.buf,1)
-            self.buf[0] = data[ii]
-            if (self.bufCnt == self.buf.size-1):
-                self.gain = self.fullScale/(np.std(self.buf)*self.numSigma)
-                self.bufCnt = 0
-            else:
-                self.bufCnt += 1
-            dataOut[ii] = np.clip(data[ii]*self.gain,-self.fullScale,
-                            self.fullScale)
-        return dataOut
+        return self.process(data)
+
+    def process(self,data):
+        """
+        Description:    Apply AGC to a block of data. Data is reshaped into
+                            bufLength segments and the gain schedule for the
+                            whole block is computed at once, with the same
+                            timing as update() (new gain applies from the
+                            last sample of each buffer).
+    
+        Params:         data:       Input data block
+        
+        Returns:        dataOut:    Output data with gain applied
+        """
+        data = np.asarray(data)
+        if (self.inFmt is not None):
+            data = self.inFmt.quantize(data)
+        numSamps = data.size
+        need = self.bufLength - self.bufCnt
+        if (numSamps < need):
+            gains = np.full(numSamps,float(self.gain))
+            self.__addStats(data)
+        else:
+            # Complete the partial buffer, then whole buffers as rows
+            self.__addStats(data[0:need])
+            firstStd = np.sqrt(self.__m2/self.bufLength)
+            numRows = (numSamps-need)//self.bufLength
+            rows = data[need:need+numRows*self.bufLength].reshape(
+                                                    numRows,self.bufLength)
+            stds = np.concatenate(([firstStd],np.std(rows,axis=1)))
+            gainSched = np.concatenate(([self.gain],
+                                    self.fullScale/(stds*self.numSigma)))
+            # Sample ii uses the gain from the last buffer ending at or
+            # before ii
+            gainInd = np.zeros(numSamps,dtype=np.int64)
+            gainInd[need-1:] = 1 + np.arange(numSamps-need+1)//self.bufLength
+            gains = gainSched[gainInd]
+            self.gain = gainSched[-1]
+            self.bufCnt = 0
+            self.__mean = 0.0
+            self.__m2 = 0.0
+            self.__addStats(data[need+numRows*self.bufLength:])
+        if (self.outFmt is not None):
+            return self.outFmt.quantize(data*gains)
+        return np.clip(data*gains,-self.fullScale,self.fullScale)
+
+    def __addStats(self,data):
+        # Merge block mean/variance into running stats (Chan et al.)
+        numNew = data.size
+        if (numNew == 0):
+            return
+        meanNew = np.mean(data)
+        m2New = np.sum((data-meanNew)**2)
+        numTot = self.bufCnt + numNew
+        delta = meanNew - self.__mean
+        self.__mean += delta*numNew/numTot
+        self.__m2 += m2New + delta**2*self.bufCnt*numNew/numTot
+        self.bufCnt = numTot
 
 """
 # EXAMPLE:
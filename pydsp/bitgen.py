@@ -1,4 +1,6 @@
 import numpy as np
+from collections import OrderedDict
+from .rng import makeRng
 
 class __BitGen:
     """
@@ -12,6 +14,7 @@ class __BitGen:
     Methods:        reset():            Reset pattern and upsampling
                     getSamp():          Get next sample in pattern
                     getArr(numBits):    Get next numBits in pattern
+                    iterArr(numBits):   Generate numBits in upsampled chunks
     """
     def __init__(self,pattern,upSampRate):
         self.upSampRate = upSampRate
@@ -52,22 +55,76 @@ class __BitGen:
             self.upSampCnt += 1
         return newSamp
 
-    def getArr(self,numBits):
+    def getArr(self,numBits,view=False,out=None):
         """
-        Description:    Gets next specified # of bits in pattern
+        Description:    Gets next specified # of bits in pattern. Starts at
+                            the current pattern index and upsample phase and
+                            advances them, so the output matches
+                            numBits*upSampRate getSamp() calls.
 
         Params:         numBits:    # of bits to return
+                        view:       (*optional) Set to True to return a
+                                        read-only (numBits, upSampRate)
+                                        broadcast view instead of a repeated
+                                        copy (requires upSampCnt = 0).
+                                        Default = False
+                        out:        (*optional) Contiguous array of at least
+                                        numBits*upSampRate samples to write
+                                        output into. Default = None
+
+        Returns:        dataOut:    Upsampled array of bits (out[0:numBits*
+                                        upSampRate] if out is given)
+        """
+        rate = self.upSampRate
+        numSamps = numBits*rate
+        phase = self.upSampCnt
+        if ((view == True) & (phase != 0)):
+            print('Error: view requires upSampCnt = 0')
+            view = False
+        bits = self.__patBits(self.ind,(phase+numSamps-1)//rate+1)
+        self.ind = (self.ind + (phase+numSamps)//rate) % self.__patLen
+        self.upSampCnt = (phase+numSamps) % rate
+        if (view == True):
+            return _upSample(bits[0:numBits],rate,view)
+        if (out is None):
+            dataOut = np.empty(numSamps)
+        else:
+            dataOut = out.reshape(-1)[0:numSamps]
+            if (np.shares_memory(dataOut,out) == False):
+                print('Error: out must be a contiguous array')
+        if (numSamps == 0):
+            return dataOut
+        # Remainder of current bit, whole bits, then start of last bit
+        head = min(rate-phase,numSamps)
+        numBody = (numSamps-head)//rate
+        tail = numSamps-head-numBody*rate
+        dataOut[0:head] = bits[0]
+        dataOut[head:head+numBody*rate].reshape(numBody,rate)[:] = \
+            bits[1:1+numBody,np.newaxis]
+        if (tail > 0):
+            dataOut[numSamps-tail:] = bits[-1]
+        return dataOut
+
+    def iterArr(self,numBits,chunkBits=4096,view=False):
+        """
+        Description:    Generator continuing the pattern for numBits bits in
+                            upsampled chunks (see getArr), so only one chunk
+                            is held in memory at a time
 
-        Returns:        dataOut:    Upsampled array of bits
+        Params:         numBits:    Total # of bits to generate
+                        chunkBits:  (*optional) # of bits per chunk.
+                                        Default = 4096
+                        view:       (*optional) Set to True to yield
+                                        broadcast views. Default = False
+
+        Returns:        dataOut:    Upsampled array of up to chunkBits bits
         """
-        dataOut = np.array([])
-        for ii in range(0,int(np.ceil(numBits/self.__patLen))):
-            if (ii == int(np.ceil(numBits/self.__patLen))-1):
-                dataOut = np.append(dataOut,self.pattern[
-                            0:numBits-dataOut.size])
-            else:
-                dataOut = np.append(dataOut,self.pattern)
-        return np.repeat(dataOut,self.upSampRate)
+        return _iterChunks(self.getArr,numBits,chunkBits,view)
+
+    def __patBits(self,start,numBits):
+        # numBits pattern values from index start, wrapping around
+        numRep = (start+numBits)//self.__patLen + 1
+        return np.tile(self.pattern,numRep)[start:start+numBits]
 
 class GenSqWv(__BitGen):
     """
@@ -138,16 +195,26 @@ class GenRndBits:
     Attributes:     upSampRate: Integer upsampling rate (default = 1)
                     zerosOut:   Set to True to use 0 instead of -1 for low
                                     bit (default = False)
+                    seed:       (*optional) int, SeedSequence or Generator
+                                    (see rng.spawn for parallel streams).
+                                    Bits are drawn 8 per random byte.
+                                    Default = None (global np.random state)
+                    rng:        numpy Generator (None if seed is None)
                     
     Methods:        reset():            Reset upsampling
                     getSamp():          Get next sample
                     getArr(numBits):    Get array of upsampled random bits
+                    iterArr(numBits):   Generate numBits in upsampled chunks
     """
-    def __init__(self,upSampRate=1,zerosOut=False):
+    def __init__(self,upSampRate=1,zerosOut=False,seed=None):
         self.upSampRate = upSampRate
         self.zerosOut = zerosOut
         self.upSampCnt = self.upSampRate-1
         self.sampOut = 0
+        if (seed is None):
+            self.rng = None
+        else:
+            self.rng = makeRng(seed)
 
     def reset(self):
         """
@@ -171,35 +238,65 @@ class GenRndBits:
         """
         if (self.upSampCnt == self.upSampRate-1):
             self.upSampCnt = 0
-            self.sampOut = np.random.randint(0,2)
+            self.sampOut = int(self.__drawBits(1)[0])
+            if (self.zerosOut == False):
+                self.sampOut = self.sampOut*2-1
         else:
             self.upSampCnt += 1      
-        if (self.zerosOut == False):
-            self.sampOut = self.sampOut*2-1
         return self.sampOut
 
-    def getArr(self,numBits):
+    def getArr(self,numBits,view=False):
         """
         Description:    Gets array of upsampled random bits
 
         Params:         numBits:    # of bits to return
+                        view:       (*optional) Set to True to return a
+                                        read-only (numBits, upSampRate)
+                                        broadcast view instead of a repeated
+                                        copy. Default = False
 
         Returns:        dataOut:    Upsampled array of bits
         """
-        dataOut = np.random.randint(0,2,numBits)
+        dataOut = self.__drawBits(numBits)
         if (self.zerosOut == False):
             dataOut = dataOut*2-1
-        return np.repeat(dataOut,self.upSampRate)
+        return _upSample(dataOut,self.upSampRate,view)
+
+    def iterArr(self,numBits,chunkBits=4096,view=False):
+        """
+        Description:    Generator yielding numBits random bits in upsampled
+                            chunks (see getArr)
+
+        Params:         numBits:    Total # of bits to generate
+                        chunkBits:  (*optional) # of bits per chunk.
+                                        Default = 4096
+                        view:       (*optional) Set to True to yield
+                                        broadcast views. Default = False
+
+        Returns:        dataOut:    Upsampled array of up to chunkBits bits
+        """
+        return _iterChunks(self.getArr,numBits,chunkBits,view)
+
+    def __drawBits(self,numBits):
+        if (self.rng is None):
+            return np.random.randint(0,2,numBits)
+        packed = self.rng.integers(0,256,(numBits+7)//8,dtype=np.uint8)
+        return np.unpackbits(packed)[0:numBits].astype(np.int64)
 
 
 class GenPn():
     """
     Designer:       Andrew Carroll
 
-    Description:    Generates maximal length PN pattern
+    Description:    Generates maximal length PN pattern. Shift register is
+                        bit-packed into an integer; block generation uses a
+                        64 bit per step table driven engine and jump-ahead
+                        (GF(2) matrix powers), so any sequence position can
+                        be reached in O(log n).
     
     Attributes:     pow2:       Specifies power of PN pattern to generate 
-                                    (currently supports 9, 15, and 23) 
+                                    (currently supports 7, 9, 11, 15, 20, 23
+                                    and 31) 
 
                     upSampRate: Integer upsampling rate (default = 1)
                     zerosOut:   Set to True to use 0 instead of -1 for low
@@ -208,24 +305,32 @@ class GenPn():
     Methods:        reset():            Reset pattern and upsampling
                     getSamp():          Get next sample
                     getArr(numPn):      Get array of upsampled bits
+                    iterArr(numPn):     Generate numPn bits in upsampled chunks
+                    jump(numPn):        Skip ahead numPn bits
+                    seek(pos):          Move to bit position pos
     """
     # Dictionary of feedback taps for specific PN patterns
-    __TAPS = {23:np.array([23,18,1]),
+    __TAPS = {31:np.array([31,28,1]),
+              23:np.array([23,18,1]),
+              20:np.array([20,3,1]),
               15:np.array([15,14,1]),
-               9:np.array([9,5,1])}
+              11:np.array([11,9,1]),
+               9:np.array([9,5,1]),
+               7:np.array([7,6,1])}
+    # Generated periods shared by all instances, keyed by (pow2, zerosOut),
+    # least recently used evicted first. Larger orders are generated on
+    # demand instead of cached.
+    __SEQ_CACHE = OrderedDict()
+    __SEQ_CACHE_SIZE = 4
+    __SEQ_CACHE_MAX_POW2 = 23
 
     def __init__(self,pow2,upSampRate=1,zerosOut=False):
         self.pow2 = pow2
         self.upSampRate = upSampRate
         self.upSampCnt = 0
         self.zerosOut = zerosOut
-        self.__shiftReg = np.ones(pow2)
-        self.__fBSel = np.zeros(pow2)
-        fBTaps = self.__TAPS[pow2]
-        for tap in fBTaps:
-            if (tap != 1):
-                self.__fBSel[tap-1] = 1
-        self.pnOut = self.__shiftReg[pow2-1]
+        self.__lfsr = _PackedLfsr(pow2,self.__TAPS[pow2][1])
+        self.reset()
 
     def reset(self):
         """
@@ -236,23 +341,31 @@ class GenPn():
         Returns:        None
         """
         self.upSampCnt = 0
-        self.__shiftReg = np.ones(self.pow2)
-        self.pnOut = self.__shiftReg[self.pow2-1]
+        # Bit ii of state is shift register element ii (all ones at reset)
+        self.__state = self.__lfsr.regMask
+        self.pnOut = 1.0
+        # # of shift register steps taken since reset (mod period)
+        self.__pos = 0
 
     def __getSeq(self):
-        pnSeq = np.zeros(2**self.pow2-1)
-        for ii, elem in enumerate(pnSeq):
-            pnSeq[ii] = self.__shiftReg[self.pow2-1]
-            fB = self.__shiftReg*self.__fBSel
-            fBXOR = sum(fB) % 2
-            self.__shiftReg = np.append(fBXOR,self.__shiftReg[0:-1])
+        # One period of outputs (output ii is pnOut after step ii+1 from
+        # reset), generated once per (pow2, zerosOut) and cached
+        key = (self.pow2,self.zerosOut)
+        cache = GenPn.__SEQ_CACHE
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        pnSeq = _lfsrSeq(self.pow2,self.__TAPS[self.pow2][1])
         if (self.zerosOut == False):
             pnSeq = pnSeq*2-1
+        cache[key] = pnSeq
+        if (len(cache) > GenPn.__SEQ_CACHE_SIZE):
+            cache.popitem(last=False)
         return pnSeq
 
     def getSamp(self):
         """
-        Description:    Gets next sample (new bit or hold previous value during
+        Description:    Gets new sample (new bit or hold previous value during
                             upsampling)
 
         Params:         None
@@ -261,37 +374,213 @@ class GenPn():
         """
         if (self.upSampCnt == self.upSampRate-1):
             self.upSampCnt = 0
-            fB = self.__shiftReg*self.__fBSel
-            fBXOR = sum(fB) % 2
-            self.__shiftReg = np.append(fBXOR,self.__shiftReg[0:-1])
-            self.pnOut = self.__shiftReg[self.pow2-1]
+            self.__state = self.__lfsr.step(self.__state)
+            self.pnOut = float(self.__state >> (self.pow2-1))
             if (self.zerosOut == False):
                 self.pnOut = self.pnOut*2-1
+            self.__pos = (self.__pos + 1) % self.__lfsr.seqLen
         else:
             self.upSampCnt += 1    
         return self.pnOut
 
-    def getArr(self,numPn):
+    def getArr(self,numPn,view=False):
         """
-        Description:    Gets array of upsampled bits
+        Description:    Gets array of upsampled bits. Continues the sequence
+                            from the current position (same bits as numPn
+                            new-bit getSamp() calls) and advances the state.
 
         Params:         numBits:    # of bits to return
+                        view:       (*optional) Set to True to return a
+                                        read-only (numPn, upSampRate)
+                                        broadcast view instead of a repeated
+                                        copy. Default = False
 
         Returns:        dataOut:    Upsampled array of bits
         """
-        pnArr = np.zeros(numPn)
-        if (numPn > 2**self.pow2-1):
+        if (self.pow2 <= self.__SEQ_CACHE_MAX_POW2):
             pnSeq = self.__getSeq()
-            numSeq = int(np.floor(numPn/pnSeq.size))
-            for ii in range(0,numSeq):
-                pnArr[ii*pnSeq.size:ii*pnSeq.size+pnSeq.size] = pnSeq
-            pnArr[numSeq*pnSeq.size:] = pnSeq[0:pnArr.size-numSeq*pnSeq.size]
+            seqLen = pnSeq.size
+            start = self.__pos
+            if (start+numPn <= seqLen):
+                pnArr = pnSeq[start:start+numPn]
+            else:
+                numRep = (numPn-(seqLen-start))//seqLen + 1
+                pnArr = np.concatenate((pnSeq[start:],np.tile(pnSeq,numRep)))
+                pnArr = pnArr[0:numPn]
+            pnArr = pnArr.astype(float)
         else:
-            for ii, elem in enumerate(pnArr):
-                self.upSampCnt = self.upSampRate-1
-                pnArr[ii] = self.getSamp()
+            pnArr = self.__lfsr.gen(self.__state,numPn).astype(float)
+            if (self.zerosOut == False):
+                pnArr = pnArr*2-1
+        if (numPn > 0):
+            self.jump(numPn)
+            self.pnOut = pnArr[-1]
         self.upSampCnt = 0
-        return np.repeat(pnArr,self.upSampRate)
+        return _upSample(pnArr,self.upSampRate,view)
+
+    def iterArr(self,numPn,chunkBits=4096,view=False):
+        """
+        Description:    Generator continuing the sequence for numPn bits in
+                            upsampled chunks (see getArr)
+
+        Params:         numPn:      Total # of bits to generate
+                        chunkBits:  (*optional) # of bits per chunk.
+                                        Default = 4096
+                        view:       (*optional) Set to True to yield
+                                        broadcast views. Default = False
+
+        Returns:        dataOut:    Upsampled array of up to chunkBits bits
+        """
+        return _iterChunks(self.getArr,numPn,chunkBits,view)
+
+    def jump(self,numPn):
+        """
+        Description:    Skip ahead numPn bits in O(log(numPn)) without
+                            generating them
+
+        Params:         numPn:      # of bits to skip
+
+        Returns:        None
+        """
+        self.__state = self.__lfsr.jump(self.__state,numPn)
+        self.__pos = (self.__pos + numPn) % self.__lfsr.seqLen
+        self.pnOut = float(self.__state >> (self.pow2-1))
+        if (self.zerosOut == False):
+            self.pnOut = self.pnOut*2-1
+
+    def seek(self,pos):
+        """
+        Description:    Move to bit position pos (# of bits after reset), so
+                            the next bit is the one returned by getArr(pos+1)
+                            after reset. Upsample counter is unchanged.
+
+        Params:         pos:        Sequence position
+
+        Returns:        None
+        """
+        self.__state = self.__lfsr.regMask
+        self.__pos = 0
+        self.jump(pos)
+
+class _PackedLfsr:
+    # Fibonacci LFSR with the shift register packed into an integer (bit ii
+    # is register element ii, output is the top bit). The map from state to
+    # the next 64 outputs, and to the state 64 steps later, is linear over
+    # GF(2), so both are applied with one table lookup per state byte.
+    def __init__(self,pow2,tap):
+        self.pow2 = pow2
+        self.seqLen = 2**pow2-1
+        self.regMask = 2**pow2-1
+        self.fBMask = (1 << (pow2-1)) | (1 << (tap-1))
+        self.__numBytes = (pow2+7)//8
+        outCols = []
+        stateCols = []
+        for jj in range(0,pow2):
+            state = 1 << jj
+            word = 0
+            for kk in range(0,64):
+                state = self.step(state)
+                word |= (state >> (pow2-1)) << kk
+            outCols.append(word)
+            stateCols.append(state)
+        self.__outTbl = self.__byteTables(outCols)
+        self.__stateTbl = self.__byteTables(stateCols)
+        # Powers A**(2**kk) of the single step matrix, built on demand
+        self.__stepPows = [[self.step(1 << jj) for jj in range(0,pow2)]]
+
+    def step(self,state):
+        fB = bin(state & self.fBMask).count('1') & 1
+        return ((state << 1) | fB) & self.regMask
+
+    def jump(self,state,numSteps):
+        numSteps = numSteps % self.seqLen
+        kk = 0
+        while (numSteps > 0):
+            if (kk == len(self.__stepPows)):
+                mat = self.__stepPows[-1]
+                self.__stepPows.append([_gf2Apply(mat,col) for col in mat])
+            if (numSteps & 1):
+                state = _gf2Apply(self.__stepPows[kk],state)
+            numSteps >>= 1
+            kk += 1
+        return state
+
+    def gen(self,state,numBits):
+        # Next numBits outputs as uint8 0/1. Output is split into lanes that
+        # start at jump-ahead states and advance 64 bits per step together.
+        numWords = -(-numBits//64)
+        numLanes = max(1,-(-numWords//256))
+        numSteps = -(-numWords//numLanes)
+        laneStates = np.zeros(numLanes,dtype=np.uint64)
+        for ii in range(0,numLanes):
+            laneStates[ii] = state
+            state = self.jump(state,64*numSteps)
+        words = np.zeros((numLanes,numSteps),dtype=np.uint64)
+        for ii in range(0,numSteps):
+            words[:,ii] = self.__lookup(self.__outTbl,laneStates)
+            laneStates = self.__lookup(self.__stateTbl,laneStates)
+        bits = np.unpackbits(words.astype('<u8').view(np.uint8),
+                                bitorder='little')
+        return bits[0:numBits]
+
+    def __byteTables(self,cols):
+        tbl = np.zeros((self.__numBytes,256),dtype=np.uint64)
+        for bb in range(0,self.__numBytes):
+            for val in range(1,256):
+                low = val & -val
+                jj = 8*bb + low.bit_length()-1
+                col = cols[jj] if (jj < self.pow2) else 0
+                tbl[bb,val] = int(tbl[bb,val ^ low]) ^ col
+        return tbl
+
+    def __lookup(self,tbl,states):
+        out = np.zeros(states.size,dtype=np.uint64)
+        for bb in range(0,self.__numBytes):
+            out ^= tbl[bb][(states >> np.uint64(8*bb)) & np.uint64(255)]
+        return out
+
+def _upSample(bits,upSampRate,view):
+    # Hold each bit for upSampRate samples, as a copy or a zero-copy view
+    if (view == True):
+        return np.broadcast_to(bits[:,np.newaxis],(bits.size,upSampRate))
+    return np.repeat(bits,upSampRate)
+
+def _iterChunks(getArr,numBits,chunkBits,view):
+    # Yield getArr() results for consecutive chunks of numBits bits
+    for start in range(0,numBits,chunkBits):
+        yield getArr(min(chunkBits,numBits-start),view)
+
+def _gf2Apply(cols,vec):
+    # Multiply GF(2) matrix (list of column bit masks) by bit vector
+    out = 0
+    jj = 0
+    while (vec > 0):
+        if (vec & 1):
+            out ^= cols[jj]
+        vec >>= 1
+        jj += 1
+    return out
+
+def _lfsrSeq(pow2,tap):
+    # One period of the Fibonacci LFSR output, reset to all ones. Bits obey
+    # s[n] = s[n-pow2] ^ s[n-tap]; squaring the feedback polynomial over
+    # GF(2) gives s[n] = s[n-k*pow2] ^ s[n-k*tap] for k = 2**j, so the block
+    # size doubles as the sequence grows.
+    seqLen = 2**pow2-1
+    seq = np.ones(seqLen+1,dtype=np.int8)
+    numDone = pow2
+    while (numDone < seq.size):
+        scale = 1
+        while (2*scale*pow2 <= numDone):
+            scale *= 2
+        lagLong = scale*pow2
+        lagShort = scale*tap
+        end = min(numDone+lagShort,seq.size)
+        seq[numDone:end] = (seq[numDone-lagLong:end-lagLong] ^
+                            seq[numDone-lagShort:end-lagShort])
+        numDone = end
+    # Output after step ii+1 is s[ii+1] (s[0:pow2] is the reset state)
+    return seq[1:]
 
 """
 # EXAMPLE:
@@ -0,0 +1,310 @@
+import numpy as np
+from .fir import FIRDecim, FIRInterp
+from .misc import Accum
+
+class CICDecim:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    Implements Cascaded Integrator Comb decimation filter.
+                        Output is not normalized (DC gain = gain).
+                        With inBitW set, input is integer and the filter is
+                        multiplier-free: integrators are modular
+                        outBitW-bit accumulators with Accum rollover
+                        semantics (cumsums in block mode) and combs are
+                        strided differences after decimation. Otherwise
+                        the equivalent (boxcar)^order FIR is computed with
+                        polyphase decimation (exact for float/complex data).
+    
+    Attributes:     decimRate:  Integer decimation rate (R)
+                    order:      (*optional) # of integrator/comb stages (N).
+                                    Default = 4
+                    diffDelay:  (*optional) Comb differential delay (M).
+                                    Default = 1
+                    inBitW:     (*optional) Input word width (bits, signed).
+                                    Default = None (floating point)
+                    gain:       DC gain, (R*M)**N
+                    bitGrowth:  Bit growth, ceil(N*log2(R*M))
+                    outBitW:    Register/output width, inBitW + bitGrowth
+                                    (must be <= 63, registers are int64)
+                    gainShift:  Right shift for approx. unity gain
+                                    (= bitGrowth)
+                    gainComp:   Gain correction to apply after gainShift
+                                    (2**gainShift/gain)
+                    decimCnt:   Decimation counter (counts input samples)
+    
+    Methods:        update(samp):   Update filter with new sample
+                    clear():        Clear filter state
+                    calc(data):     Return filtered, decimated data array
+                    process(data):  Filter and decimate data block, keeping
+                                        state between calls
+    """
+    def __init__(self,decimRate,order=4,diffDelay=1,inBitW=None):
+        self.decimRate = decimRate
+        self.order = order
+        self.diffDelay = diffDelay
+        self.inBitW = inBitW
+        self.gain = (decimRate*diffDelay)**order
+        self.bitGrowth = int(np.ceil(order*np.log2(decimRate*diffDelay)))
+        self.gainShift = self.bitGrowth
+        self.gainComp = 2**self.gainShift/self.gain
+        if (inBitW is None):
+            self.outBitW = None
+            self.__filt = FIRDecim(_cicTaps(decimRate,order,diffDelay),
+                                    decimRate)
+        else:
+            self.outBitW = inBitW + self.bitGrowth
+            if (self.outBitW > 63):
+                raise ValueError('Error: outBitW (%d) exceeds 63 bit int64 '
+                                 'registers' % self.outBitW)
+            self.__mask = 2**self.outBitW-1
+        self.clear()
+
+    def update(self,samp):
+        """
+        Description:    Update filter with new sample
+
+        Params:         samp:           New data sample
+
+        Returns:        filtOut:        Filter output sample (held between
+                                            valid outputs)
+                        filtOutValid:   Valid output flag
+        """
+        if (self.inBitW is None):
+            return self.__filt.update(samp)
+        val = int(samp)
+        for integ in self.__integ:
+            val = integ.update(val)
+        self.decimCnt += 1
+        if (self.decimCnt < self.decimRate):
+            return (self.__filtOut,0)
+        self.decimCnt = 0
+        for hist in self.__combHist:
+            old = int(hist[0])
+            hist[0:-1] = hist[1:]
+            hist[-1] = val
+            val = (val - old) & self.__mask
+        self.__filtOut = int(_toSigned(np.int64(val),self.outBitW))
+        return (self.__filtOut,1)
+
+    def clear(self):
+        """
+        Description:    Clear filter state
+
+        Params:         None
+
+        Returns:        None
+        """
+        self.decimCnt = 0
+        if (self.inBitW is None):
+            self.__filt.clear()
+        else:
+            self.__integ = [Accum(self.__mask) for ii in range(0,self.order)]
+            # Last diffDelay comb inputs per stage, oldest first
+            self.__combHist = np.zeros((self.order,self.diffDelay),
+                                        dtype=np.int64)
+            self.__filtOut = 0
+
+    def calc(self,data):
+        """
+        Description:    Apply CIC filter to input data array. Clears filter
+                            prior to filtering.
+
+        Params:         data:       Input data array
+
+        Returns:        filtData:   Filtered data of size
+                                        floor(data.size/decimRate)
+        """
+        self.clear()
+        return self.process(data)
+
+    def process(self,data):
+        """
+        Description:    Apply CIC filter to a block of input data. State and
+                            decimation phase are carried between calls.
+
+        Params:         data:       Input data block
+
+        Returns:        filtData:   Filtered data (one sample per decimRate
+                                        inputs)
+        """
+        if (self.inBitW is None):
+            return self.__filt.process(data)
+        data = np.asarray(data).astype(np.int64)
+        first = self.decimRate - self.decimCnt - 1
+        self.decimCnt = (self.decimCnt + data.size) % self.decimRate
+        # int64 overflow in cumsum wraps modulo 2**64, so masking afterwards
+        # still gives the exact modulo 2**outBitW result
+        for integ in self.__integ:
+            data = (integ.accum + np.cumsum(data)) & self.__mask
+            if (data.size > 0):
+                integ.accum = int(data[-1])
+        data = data[first::self.decimRate]
+        for ii in range(0,self.order):
+            ext = np.concatenate((self.__combHist[ii],data))
+            self.__combHist[ii] = ext[ext.size-self.diffDelay:]
+            data = (ext[self.diffDelay:] - ext[0:-self.diffDelay]) & self.__mask
+        filtData = _toSigned(data,self.outBitW)
+        if (filtData.size > 0):
+            self.__filtOut = int(filtData[-1])
+        return filtData
+
+class CICInterp:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    Implements Cascaded Integrator Comb interpolation
+                        filter. Output is not normalized (DC gain = gain).
+                        With inBitW set, input is integer and the filter is
+                        multiplier-free: combs are strided differences at
+                        the input rate, then zero stuffing and modular
+                        outBitW-bit integrators with Accum rollover semantics
+                        (cumsums in block mode). Otherwise the equivalent
+                        (boxcar)^order FIR is computed in polyphase form.
+    
+    Attributes:     interpRate: Integer interpolation rate (R)
+                    order:      (*optional) # of comb/integrator stages (N).
+                                    Default = 4
+                    diffDelay:  (*optional) Comb differential delay (M).
+                                    Default = 1
+                    inBitW:     (*optional) Input word width (bits, signed).
+                                    Default = None (floating point)
+                    gain:       DC gain, (R*M)**N/R
+                    bitGrowth:  Bit growth, ceil(log2(gain))
+                    outBitW:    Register/output width, inBitW + bitGrowth
+                                    (must be <= 63, registers are int64)
+                    gainShift:  Right shift for approx. unity gain
+                                    (= bitGrowth)
+                    gainComp:   Gain correction to apply after gainShift
+                                    (2**gainShift/gain)
+    
+    Methods:        update(samp):   Update filter, return interpRate outputs
+                    clear():        Clear filter state
+                    calc(data):     Return interpolated data array
+                    process(data):  Interpolate data block, keeping state
+                                        between calls
+    """
+    def __init__(self,interpRate,order=4,diffDelay=1,inBitW=None):
+        self.interpRate = interpRate
+        self.order = order
+        self.diffDelay = diffDelay
+        self.inBitW = inBitW
+        self.gain = (interpRate*diffDelay)**order/interpRate
+        self.bitGrowth = int(np.ceil(np.log2(self.gain)))
+        self.gainShift = self.bitGrowth
+        self.gainComp = 2**self.gainShift/self.gain
+        if (inBitW is None):
+            self.outBitW = None
+            self.__filt = FIRInterp(_cicTaps(interpRate,order,diffDelay),
+                                    interpRate)
+        else:
+            self.outBitW = inBitW + self.bitGrowth
+            if (self.outBitW > 63):
+                raise ValueError('Error: outBitW (%d) exceeds 63 bit int64 '
+                                 'registers' % self.outBitW)
+            self.__mask = 2**self.outBitW-1
+        self.clear()
+
+    def update(self,samp):
+        """
+        Description:    Update filter with new sample
+
+        Params:         samp:       New data sample
+
+        Returns:        filtOut:    Array of interpRate output samples
+        """
+        if (self.inBitW is None):
+            return self.__filt.update(samp)
+        val = int(samp)
+        for hist in self.__combHist:
+            old = int(hist[0])
+            hist[0:-1] = hist[1:]
+            hist[-1] = val
+            val = (val - old) & self.__mask
+        filtOut = np.zeros(self.interpRate,dtype=np.int64)
+        for ii in range(0,self.interpRate):
+            for integ in self.__integ:
+                val = integ.update(val)
+            filtOut[ii] = val
+            val = 0
+        return _toSigned(filtOut,self.outBitW)
+
+    def clear(self):
+        """
+        Description:    Clear filter state
+
+        Params:         None
+
+        Returns:        None
+        """
+        if (self.inBitW is None):
+            self.__filt.clear()
+        else:
+            self.__integ = [Accum(self.__mask) for ii in range(0,self.order)]
+            # Last diffDelay comb inputs per stage, oldest first
+            self.__combHist = np.zeros((self.order,self.diffDelay),
+                                        dtype=np.int64)
+
+    def calc(self,data):
+        """
+        Description:    Apply CIC interpolator to input data array. Clears
+                            filter prior to filtering.
+
+        Params:         data:       Input data array
+
+        Returns:        filtData:   Interpolated data of size
+                                        data.size*interpRate
+        """
+        self.clear()
+        return self.process(data)
+
+    def process(self,data):
+        """
+        Description:    Apply CIC interpolator to a block of input data.
+                            State is carried between calls.
+
+        Params:         data:       Input data block
+
+        Returns:        filtData:   Interpolated data of size
+                                        data.size*interpRate
+        """
+        if (self.inBitW is None):
+            return self.__filt.process(data)
+        data = np.asarray(data).astype(np.int64)
+        for ii in range(0,self.order):
+            ext = np.concatenate((self.__combHist[ii],data))
+            self.__combHist[ii] = ext[ext.size-self.diffDelay:]
+            data = (ext[self.diffDelay:] - ext[0:-self.diffDelay]) & self.__mask
+        stuffed = np.zeros(data.size*self.interpRate,dtype=np.int64)
+        stuffed[0::self.interpRate] = data
+        for integ in self.__integ:
+            stuffed = (integ.accum + np.cumsum(stuffed)) & self.__mask
+            if (stuffed.size > 0):
+                integ.accum = int(stuffed[-1])
+        return _toSigned(stuffed,self.outBitW)
+
+def _cicTaps(rate,order,diffDelay):
+    # Equivalent FIR taps of CIC filter, (boxcar of rate*diffDelay)^order
+    boxcar = np.ones(rate*diffDelay)
+    taps = boxcar
+    for ii in range(1,order):
+        taps = np.convolve(taps,boxcar)
+    return taps
+
+def _toSigned(data,bitW):
+    # Interpret bitW-bit modular register values as two's complement
+    return np.where(data >= 2**(bitW-1),data - 2**bitW,data)
+
+"""
+# EXAMPLE:
+import matplotlib.pyplot as plt
+cic = CICDecim(16,4,1,12)
+print(cic.bitGrowth,cic.outBitW,cic.gainComp)
+x = np.round(2000*np.sin(2*np.pi*0.002*np.arange(0,8000)))
+y = cic.calc(x) >> cic.gainShift
+interp = CICInterp(16,4,1,12)
+z = interp.calc(y)
+plt.figure()
+plt.plot(x,'r',z/interp.gain,'b')
+plt.show()
+"""
@@ -0,0 +1,108 @@
+import numpy as np
+from .misc import NCO
+from .cic import CICDecim
+from .fir import FIRDecim
+
+class DDC:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    Implements Digital Down Converter for an arbitrary
+                        carrier. Mixes input with a complex NCO
+                        (exp(-j*2*pi*fCar*t)), decimates by cicRate with a
+                        gain normalized CIC filter, then optionally filters
+                        and decimates by compDecim with an FIR compensator.
+                        Works on streamed blocks with all state carried
+                        between calls.
+    
+    Attributes:     fSamp:      Input sample rate in same units as fCar
+                    fCar:       Carrier frequency in same units as fSamp
+                    cicRate:    CIC decimation rate
+                    cicOrder:   (*optional) CIC order. Default = 4
+                    compTaps:   (*optional) FIR compensator taps.
+                                    Default = None (no compensator)
+                    compDecim:  (*optional) Compensator decimation rate.
+                                    Default = 1
+                    phaseBits:  (*optional) NCO phase accumulator width.
+                                    Default = 32
+                    lutBits:    (*optional) NCO lookup table address width.
+                                    Default = 12
+                    freqWord:   NCO frequency word
+                    decimRate:  Total decimation rate
+    
+    Methods:        clear():        Clear NCO phase and filter states
+                    calc(data):     Downconvert data array
+                    process(data):  Downconvert data block, keeping state
+                                        between calls
+    """
+    def __init__(self,fSamp,fCar,cicRate,cicOrder=4,compTaps=None,compDecim=1,
+                    phaseBits=32,lutBits=12):
+        self.fSamp = fSamp
+        self.fCar = fCar
+        self.cicRate = cicRate
+        self.cicOrder = cicOrder
+        self.compTaps = compTaps
+        self.compDecim = compDecim
+        self.phaseBits = phaseBits
+        self.lutBits = lutBits
+        self.freqWord = int(round(fCar/fSamp*2**phaseBits)) % 2**phaseBits
+        self.decimRate = cicRate*compDecim
+        self.__nco = NCO(2**phaseBits-1,lutBits)
+        self.__cic = CICDecim(cicRate,cicOrder)
+        if (compTaps is not None):
+            self.__comp = FIRDecim(compTaps,compDecim)
+
+    def clear(self):
+        """
+        Description:    Clear NCO phase and filter states
+
+        Params:         None
+
+        Returns:        None
+        """
+        self.__nco.clear()
+        self.__cic.clear()
+        if (self.compTaps is not None):
+            self.__comp.clear()
+
+    def calc(self,data):
+        """
+        Description:    Downconvert input data array. Clears DDC prior to
+                            processing.
+
+        Params:         data:       Input data array
+
+        Returns:        dataOut:    Complex baseband data
+        """
+        self.clear()
+        return self.process(data)
+
+    def process(self,data):
+        """
+        Description:    Downconvert a block of input data
+
+        Params:         data:       Input data block (real or complex)
+
+        Returns:        dataOut:    Complex baseband data at
+                                        fSamp/decimRate
+        """
+        data = np.asarray(data)
+        cosLo,sinLo = self.__nco.calcSinCos(self.freqWord,data.size)
+        mixed = data*(cosLo - 1j*sinLo)
+        dataOut = self.__cic.process(mixed)/self.__cic.gain
+        if (self.compTaps is not None):
+            dataOut = self.__comp.process(dataOut)
+        return dataOut
+
+"""
+# EXAMPLE:
+import matplotlib.pyplot as plt
+fSamp = 100e6
+t = np.arange(0,20000)/fSamp
+sig = np.cos(2*np.pi*(21.4e6+50e3)*t)
+ddc = DDC(fSamp,21.4e6,50)
+base = ddc.calc(sig)
+plt.figure()
+plt.plot(base.real,'b',base.imag,'r')
+plt.show()
+"""
@@ -8,7 +8,9 @@ class Fft:
 
     Description:    Calculates and optionally plots fft of input data set in dB.  
                     Does not zero pad. Divides input array up into numAvg  
-                    sections, calcs fft of each and averages. Uses hann window.
+                    sections, calcs fft of each and averages (Welch). Uses
+                    hann window. Sections are windowed and transformed
+                    together in batches.
     
     Attributes:     data:   Input data array
                     fs:     Sampling rate (Hz)
@@ -18,31 +20,39 @@ class Fft:
                                 Must be power of 2. Default = 1.
                     window: (*Optional) Windowing function. Supports 'hanning'
                                 or 'none'. Default = 'hanning' 
+                    overlap:(*Optional) Fraction of each section overlapping
+                                the previous one (0 <= overlap < 1).
+                                Default = 0
+                    useAll: (*Optional) Set to True to average every section
+                                that fits in the data (at the section length
+                                set by numAvg) instead of exactly numAvg
+                                sections. Default = False
+                    nfft:   (*Optional) Section length. Required by push().
+                                Default = None (set from data size and
+                                numAvg)
+                    numFrames:  # of sections averaged by push()
     
-    Methods:        plot(data): Calculates FFT and generates plot
-                    calc(data): Calculates FFT  
+    Methods:        plot(data):         Calculates FFT and generates plot
+                    calc(data):         Calculates FFT  
+                    setWindow(window):  Set window function
+                    push(data):         Add data block to running average
+                    getSpectrum():      Get running average spectrum
+                    reset():            Clear running average
     """
-    def __init__(self,fsHz,plotUnits,numAvg=1,window='hanning'):
+    # Max # of samples windowed and transformed per batch
+    __BATCH_SAMPS = 2**20
+
+    def __init__(self,fsHz,plotUnits,numAvg=1,window='hanning',overlap=0,
+                    useAll=False,nfft=None):
         self.fs = fsHz
         self.units = plotUnits
         self.numAvg = numAvg
-        if (self.units.lower() == 'GHz'.lower()):
-          self.__range = 1e9
-        elif (self.units.lower() == 'MHz'.lower()):
-          self.__range = 1e6
-        elif (self.units.lower() == 'kHz'.lower()):
-          self.__range = 1e3
-        elif (self.units.lower() == 'Hz'.lower()):
-          self.__range = 1e0
-        else:
-          print('Error: Invalid units')
-
-        if ((window.lower() == 'hanning'.lower()) |
-                (window.lower() == 'hann'.lower())):
-            self.__window = 'hann'
-        else:
-            self.__window = 'none'
-        
+        self.overlap = overlap
+        self.useAll = useAll
+        self.nfft = nfft
+        self.__range = _unitRange(plotUnits)
+        self.setWindow(window)
+        self.reset()
 
     def setWindow(self,window):
         """
@@ -52,37 +62,110 @@ class Fft:
         
         Returns:        None 
         """
-        if ((window.units.lower() == 'hanning') |
-                (window.units.lower() == 'hann')):
-            self.__window = 'hann'
-        else:
-            self.__window = 'none'
+        self.__window = _windowName(window)
         return
 
-    def __crunch(self,data):
-        pow2 = int(np.floor(np.log2(data.size)) - 
-                    np.floor(np.log2(self.numAvg)))
-        if pow2 < 1:
-            print('Error: Too many averages!')
-            return
-
-        nfft   = 2**pow2
-        ySum   = np.zeros(nfft)
-        if (self.__window == 'hann'):
-            window = np.hanning(nfft)
-        else:
-            window = np.ones(nfft)
-
-        for ii in range(0,int(2**np.floor(np.log2(self.numAvg)))):
-            dataWin = data[ii*nfft:(ii+1)*nfft]*window
-            Y = np.abs(np.fft.fft(dataWin,nfft))/nfft
-            ySum += Y**2;
-        yAvg = ySum/2**np.floor(np.log2(self.numAvg));
+    def __frameSum(self,frames):
+        # Sum over frames (rows) of windowed power spectrum, |Y/nfft|**2.
+        # Rows are processed in batches to bound temporary memory.
+        nfft = frames.shape[1]
+        window = _getWindow(self.__window,nfft)
+        isComplex = np.iscomplexobj(frames)
+        ySum = np.zeros(nfft//2+1)
+        batch = max(1,self.__BATCH_SAMPS//nfft)
+        for st in range(0,frames.shape[0],batch):
+            dataWin = frames[st:st+batch]*window
+            if (isComplex == True):
+                Y = np.fft.fft(dataWin,axis=1)[:,0:nfft//2+1]
+            else:
+                Y = np.fft.rfft(dataWin,axis=1)
+            ySum += np.sum(Y.real**2 + Y.imag**2,axis=0)
+        return ySum/nfft**2
 
+    def __toDb(self,yAvg,nfft):
         freq = self.fs/2*np.linspace(0,1,int(nfft/2))/self.__range
         resp = 10*np.log10(yAvg[0:nfft//2])
         return freq,resp
 
+    def __crunch(self,data):
+        data = np.asarray(data)
+        if (self.nfft is not None):
+            nfft = self.nfft
+            if (nfft > data.size):
+                print('Error: Too few samples for nfft!')
+                return
+        else:
+            pow2 = int(np.floor(np.log2(data.size)) - 
+                        np.floor(np.log2(self.numAvg)))
+            if pow2 < 1:
+                print('Error: Too many averages!')
+                return
+            nfft = 2**pow2
+        hop = _getHop(self.overlap,nfft)
+        if (self.useAll == True):
+            numFrames = (data.size-nfft)//hop + 1
+        else:
+            numFrames = int(2**np.floor(np.log2(self.numAvg)))
+            numFrames = min(numFrames,(data.size-nfft)//hop + 1)
+        frames = np.lib.stride_tricks.sliding_window_view(data,nfft)[::hop]
+        yAvg = self.__frameSum(frames[0:numFrames])/numFrames
+        return self.__toDb(yAvg,nfft)
+
+    def push(self,data):
+        """
+        Description:    Add data block to running average spectrum. Samples
+                            left over after the last complete section are
+                            kept for the next call, so memory depends only
+                            on nfft.
+    
+        Params:         data: input data block
+        
+        Returns:        None
+        """
+        if (self.nfft is None):
+            print('Error: nfft must be set to push data')
+            return
+        data = np.concatenate((self.__pend,np.asarray(data)))
+        hop = _getHop(self.overlap,self.nfft)
+        numFrames = 0
+        if (data.size >= self.nfft):
+            numFrames = (data.size-self.nfft)//hop + 1
+            frames = np.lib.stride_tricks.sliding_window_view(data,
+                                                        self.nfft)[::hop]
+            self.__ySum += self.__frameSum(frames[0:numFrames])
+            self.numFrames += numFrames
+        self.__pend = data[numFrames*hop:].copy()
+        return
+
+    def getSpectrum(self):
+        """
+        Description:    Get spectrum averaged over all sections pushed since
+                            reset, in dB.
+    
+        Params:         None
+        
+        Returns:        freq: frequency array in 'units'
+                        resp: FFT calculation (dB) 
+        """
+        if (self.numFrames == 0):
+            print('Error: No complete sections pushed')
+            return
+        return self.__toDb(self.__ySum/self.numFrames,self.nfft)
+
+    def reset(self):
+        """
+        Description:    Clear running average and pending samples
+    
+        Params:         None
+        
+        Returns:        None
+        """
+        self.numFrames = 0
+        if (self.nfft is not None):
+            self.__ySum = np.zeros(self.nfft//2+1)
+        self.__pend = np.zeros(0)
+        return
+
     def plot(self,data):
         """
         Description:    Calculates and plots fft of input data set in dB.
@@ -114,6 +197,192 @@ class Fft:
         return freq,resp    
 
 
+class Spectrogram:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    Calculates and optionally plots spectrogram (waterfall) of
+                    input data in dB, with the same units, windowing and
+                    scaling as Fft. Frames are strided views of the input
+                    transformed in batches. Streams over data blocks with
+                    the partial frame and overlap carried between calls.
+    
+    Attributes:     fs:         Sampling rate (Hz)
+                    units:      String input for desired freq units on plot
+                                    ('GHz','MHz','kHz','Hz')
+                    nfft:       Frame length
+                    window:     (*Optional) Windowing function. Supports
+                                    'hanning' or 'none'. Default = 'hanning'
+                    overlap:    (*Optional) Fraction of each frame
+                                    overlapping the previous one
+                                    (0 <= overlap < 1). Default = 0.5
+                    dtype:      (*Optional) Computation and output type,
+                                    np.float32 or np.float64.
+                                    Default = np.float64
+                    freq:       Frequency array in 'units'
+                    numFrames:  # of frames output since clear
+    
+    Methods:        plot(data):         Calculates spectrogram and plots it
+                    calc(data):         Calculates spectrogram
+                    process(data):      Calculates spectrogram of data block,
+                                            keeping partial frame between
+                                            calls
+                    setWindow(window):  Set window function
+                    clear():            Clear partial frame and frame count
+    """
+    # Max # of samples windowed and transformed per batch
+    __BATCH_SAMPS = 2**18
+
+    def __init__(self,fsHz,plotUnits,nfft,window='hanning',overlap=0.5,
+                    dtype=np.float64):
+        self.fs = fsHz
+        self.units = plotUnits
+        self.nfft = nfft
+        self.overlap = overlap
+        self.dtype = np.dtype(dtype)
+        self.__range = _unitRange(plotUnits)
+        self.__hop = _getHop(overlap,nfft)
+        self.freq = self.fs/2*np.linspace(0,1,int(nfft/2))/self.__range
+        self.setWindow(window)
+        self.clear()
+
+    def setWindow(self,window):
+        """
+        Description:    Set window function.
+    
+        Params:         window: Windowing function. Supports 'hanning or 'none'
+        
+        Returns:        None 
+        """
+        self.__window = _windowName(window)
+        return
+
+    def clear(self):
+        """
+        Description:    Clear partial frame and frame count
+    
+        Params:         None
+        
+        Returns:        None
+        """
+        self.numFrames = 0
+        self.__pend = np.zeros(0,dtype=self.dtype)
+        return
+
+    def process(self,data):
+        """
+        Description:    Calculates spectrogram of data block. Samples after
+                            the last complete frame are kept, so blocks
+                            stream continuously.
+    
+        Params:         data: input data block
+        
+        Returns:        time: frame center times (s) since clear
+                        freq: frequency array in 'units'
+                        resp: Spectrogram (dB), one row per frame
+        """
+        data = np.concatenate((self.__pend,np.asarray(data)))
+        nfft = self.nfft
+        hop = self.__hop
+        numFrames = 0
+        if (data.size >= nfft):
+            numFrames = (data.size-nfft)//hop + 1
+        isComplex = np.iscomplexobj(data)
+        if (isComplex == False):
+            data = data.astype(self.dtype,copy=False)
+        resp = np.zeros((numFrames,nfft//2),dtype=self.dtype)
+        if (numFrames > 0):
+            window = _getWindow(self.__window,nfft,self.dtype)
+            frames = np.lib.stride_tricks.sliding_window_view(data,
+                                                            nfft)[::hop]
+            batch = max(1,self.__BATCH_SAMPS//nfft)
+            for st in range(0,numFrames,batch):
+                dataWin = frames[st:min(st+batch,numFrames)]*window
+                if (isComplex == True):
+                    Y = np.fft.fft(dataWin,axis=1)[:,0:nfft//2]
+                else:
+                    Y = np.fft.rfft(dataWin,axis=1)[:,0:nfft//2]
+                pwr = (Y.real**2 + Y.imag**2).astype(self.dtype,copy=False)
+                resp[st:st+pwr.shape[0]] = 10*np.log10(pwr/nfft**2)
+        time = ((self.numFrames + np.arange(numFrames))*hop + nfft/2)/self.fs
+        self.numFrames += numFrames
+        self.__pend = data[numFrames*hop:].copy()
+        return time,self.freq,resp
+
+    def calc(self,data):
+        """
+        Description:    Calculates spectrogram of input data set in dB.
+                            Clears state prior to calculation.
+    
+        Params:         data: input data array
+        
+        Returns:        time: frame center times (s)
+                        freq: frequency array in 'units'
+                        resp: Spectrogram (dB), one row per frame
+        """
+        self.clear()
+        return self.process(data)
+
+    def plot(self,data):
+        """
+        Description:    Calculates and plots spectrogram of input data set.
+    
+        Params:         data: input data array
+        
+        Returns:        time: frame center times (s)
+                        freq: frequency array in 'units'
+                        resp: Spectrogram (dB), one row per frame
+        """
+        time,freq,resp = self.calc(data)
+        plt.figure()
+        plt.pcolormesh(freq,time,resp,shading='auto')
+        plt.xlabel(('Freq (' + self.units + ')'))
+        plt.ylabel('Time (s)')
+        plt.title('Spectrogram')
+        plt.colorbar(label='Amplitude (dB)')
+        plt.show()
+        return time,freq,resp
+
+# Windows shared by Fft and Spectrogram, keyed by (window, nfft, dtype)
+_WINDOWS = {}
+
+def _unitRange(units):
+    # Frequency scale of plot units
+    if (units.lower() == 'GHz'.lower()):
+        return 1e9
+    elif (units.lower() == 'MHz'.lower()):
+        return 1e6
+    elif (units.lower() == 'kHz'.lower()):
+        return 1e3
+    elif (units.lower() == 'Hz'.lower()):
+        return 1e0
+    print('Error: Invalid units')
+    return 1e0
+
+def _windowName(window):
+    if ((window.lower() == 'hanning') |
+            (window.lower() == 'hann')):
+        return 'hann'
+    return 'none'
+
+def _getWindow(window,nfft,dtype=np.float64):
+    key = (window,nfft,np.dtype(dtype))
+    if key not in _WINDOWS:
+        if (window == 'hann'):
+            _WINDOWS[key] = np.hanning(nfft).astype(dtype)
+        else:
+            _WINDOWS[key] = np.ones(nfft,dtype=dtype)
+    return _WINDOWS[key]
+
+def _getHop(overlap,nfft):
+    # Frame step for fractional overlap
+    hop = nfft - int(round(overlap*nfft))
+    if (hop < 1):
+        print('Error: Overlap must be less than 1')
+        hop = 1
+    return hop
+
+
 # EXAMPLE:
 '''
 f = 1000
@@ -124,4 +393,6 @@ plt.plot(t,data)
 plt.draw()
 test = Fft(100e3,'kHz',2)
 freq,dataOut = test.plot(data)
+spec = Spectrogram(100e3,'kHz',64)
+time,freq,waterfall = spec.plot(data)
 '''
\ No newline at end of file
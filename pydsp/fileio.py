@@ -0,0 +1,158 @@
+import os
+import numpy as np
+from .fixedpt import FixedPt
+
+class FileSrc:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    Raw binary sample file source. File is memory mapped,
+                        so captures larger than RAM are read one chunk at a
+                        time. Real data and float32 complex data are
+                        returned as views of the file (no copies).
+                        Iterating yields chunkSize blocks from the current
+                        position, ready for process()/push() of other
+                        blocks.
+    
+    Attributes:     fileName:   Path of sample file
+                    dtype:      (*optional) Sample type, 'int8', 'int16' or
+                                    'float32'. Default = 'int16'
+                    isComplex:  (*optional) Set to True for interleaved I/Q
+                                    samples. Default = False
+                    chunkSize:  (*optional) # of samples per iteration
+                                    chunk. Default = 65536
+                    numSamps:   # of (complex) samples in file
+                    pos:        Index of next sample to read
+    
+    Methods:        read(numSamps): Read next numSamps samples
+                    seek(pos):      Set read position
+                    __iter__():     Iterate over file in chunkSize blocks
+    """
+    def __init__(self,fileName,dtype='int16',isComplex=False,chunkSize=65536):
+        self.fileName = fileName
+        self.dtype = np.dtype(dtype)
+        self.isComplex = isComplex
+        self.chunkSize = chunkSize
+        if (self.dtype.name not in ('int8','int16','float32')):
+            print('Error: Invalid dtype')
+        if (os.path.getsize(fileName) == 0):
+            self.__raw = np.zeros(0,dtype=self.dtype)
+        else:
+            self.__raw = np.memmap(fileName,dtype=self.dtype,mode='r')
+        if (isComplex == True):
+            self.__raw = self.__raw[0:self.__raw.size//2*2].reshape(-1,2)
+        self.numSamps = self.__raw.shape[0]
+        self.pos = 0
+
+    def read(self,numSamps):
+        """
+        Description:    Read next samples and advance position. Returns fewer
+                            samples at end of file.
+
+        Params:         numSamps:   # of samples to read
+
+        Returns:        dataOut:    Sample array (complex if isComplex)
+        """
+        raw = self.__raw[self.pos:self.pos+numSamps]
+        self.pos += raw.shape[0]
+        if (self.isComplex == False):
+            return raw
+        if (self.dtype == np.float32):
+            return raw.view(np.complex64)[:,0]
+        return raw[:,0] + 1j*raw[:,1].astype(np.float32)
+
+    def seek(self,pos):
+        """
+        Description:    Set read position
+
+        Params:         pos:        Index of next sample to read
+
+        Returns:        None
+        """
+        self.pos = min(max(pos,0),self.numSamps)
+
+    def __iter__(self):
+        while (self.pos < self.numSamps):
+            yield self.read(self.chunkSize)
+
+class FileSink:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    Raw binary sample file sink. Each block is written
+                        through a memory map of the newly extended end of
+                        the file. Integer formats are rounded and saturated
+                        (FixedPt).
+    
+    Attributes:     fileName:   Path of sample file (created or truncated)
+                    dtype:      (*optional) Sample type, 'int8', 'int16' or
+                                    'float32'. Default = 'int16'
+                    isComplex:  (*optional) Set to True to write interleaved
+                                    I/Q samples. Default = False
+                    numSamps:   # of (complex) samples written
+                    quant:      FixedPt used for integer formats (None for
+                                    float32), holds saturation count
+    
+    Methods:        write(data):    Append samples to file
+    """
+    def __init__(self,fileName,dtype='int16',isComplex=False):
+        self.fileName = fileName
+        self.dtype = np.dtype(dtype)
+        self.isComplex = isComplex
+        if (self.dtype.name not in ('int8','int16','float32')):
+            print('Error: Invalid dtype')
+        if (self.dtype == np.float32):
+            self.quant = None
+        else:
+            self.quant = FixedPt(8*self.dtype.itemsize)
+        self.numSamps = 0
+        open(fileName,'wb').close()
+
+    def write(self,data):
+        """
+        Description:    Append samples to file
+
+        Params:         data:       Sample array (complex if isComplex)
+
+        Returns:        None
+        """
+        data = np.asarray(data).reshape(-1)
+        if (data.size == 0):
+            return
+        numVals = data.size
+        if (self.isComplex == True):
+            numVals *= 2
+        offset = self.numSamps*self.dtype.itemsize*(1+int(self.isComplex))
+        with open(self.fileName,'r+b') as fid:
+            fid.truncate(offset + numVals*self.dtype.itemsize)
+        mm = np.memmap(self.fileName,dtype=self.dtype,mode='r+',
+                        offset=offset,shape=(numVals,))
+        if (self.isComplex == True):
+            mm[0::2] = self.__convert(data.real)
+            mm[1::2] = self.__convert(data.imag)
+        else:
+            mm[:] = self.__convert(data)
+        mm.flush()
+        del mm
+        self.numSamps += data.size
+
+    def __convert(self,data):
+        if (self.quant is None):
+            return data
+        return self.quant.quantize(data)
+
+"""
+# EXAMPLE:
+from fir import FIR
+from fft import Fft
+sink = FileSink('capture.bin','int16',True)
+for ii in range(0,10):
+    t = np.arange(ii*100000,(ii+1)*100000)
+    sink.write(8000*np.exp(2j*np.pi*0.05*t))
+src = FileSrc('capture.bin','int16',True,chunkSize=32768)
+filt = FIR(np.ones(8)/8)
+spec = Fft(1e6,'kHz',nfft=4096)
+for chunk in src:
+    spec.push(filt.process(chunk))
+freq,resp = spec.getSpectrum()
+"""
@@ -4,37 +4,98 @@ class FIR:
     """
     Designer:       Andrew Carroll
 
-    Description:    Implements FIR filter.
+    Description:    Implements FIR filter. Accepts real or complex data and
+                        multichannel (channels,samples) arrays that share
+                        the same taps.
     
     Attributes:     taps:       Filter taps
                     scale_mult  Value to scale multiply results by prior to accumulate
                     scale_accum Value to scale accumulator output by
                     length:     Length of filter
                     shiftReg:   Filter shift register
+                    method:     (*optional) Block filtering method. 'direct',
+                                    'fft' (overlap-save) or 'auto' (fft for
+                                    filters of FFT_TAPS taps or more).
+                                    Default = 'auto'
+                    inFmt:      (*optional) FixedPt input format. Default =
+                                    None (integer input assumed in fixed
+                                    point mode)
+                    outFmt:     (*optional) FixedPt output format. Enables
+                                    bit-true fixed point mode: integer taps,
+                                    int64 accumulation, scale_mult and
+                                    scale_accum replaced by outShift.
+                                    Default = None (floating point)
+                    outShift:   (*optional) # of bits accumulator is shifted
+                                    right by prior to outFmt. Default = 0
     
     Methods:        update(newVal): Update filter buffer and return new output
                     clear():        Clear filter shift register
                     calc(data):     Return filtered data array
+                    process(data):  Filter data block, keeping shift register
+                                        state between calls
     """
+    # Tap count at and above which 'auto' method uses FFT convolution
+    FFT_TAPS = 64
+    # Max # of overlap-save frames transformed per batch (bounds memory)
+    __FFT_BATCH = 256
 
-    def __init__(self, taps, scale_mult=1, scale_accum=1):
+    def __init__(self, taps, scale_mult=1, scale_accum=1, method='auto',
+                    inFmt=None, outFmt=None, outShift=0):
         self.taps = taps
         self.scale_mult = scale_mult
         self.scale_accum = scale_accum
         self.length = taps.size
-        self.shiftReg = np.zeros(self.length)
+        self.inFmt = inFmt
+        self.outFmt = outFmt
+        self.outShift = outShift
+        if (outFmt is None):
+            self.__dtype = float
+        else:
+            self.__dtype = np.int64
+            self.__intTaps = np.rint(taps).astype(np.int64)
+        # Circular buffer holds each sample twice so shiftReg is always a
+        # contiguous view starting at the write index
+        self.__buf = np.zeros(2*self.length,dtype=self.__dtype)
+        self.__ind = 0
+        if (method.lower() not in ('direct','fft','auto')):
+            print('Error: Invalid method')
+        self.method = method.lower()
+        self.__tapsFft = {}
+
+    @property
+    def shiftReg(self):
+        # Newest sample first (last axis), one row per channel
+        return self.__buf[...,self.__ind:self.__ind+self.length]
+
+    @shiftReg.setter
+    def shiftReg(self,value):
+        self.__buf = np.concatenate((value,value),axis=-1)
+        self.__ind = 0
 
     def update(self,samp):
         """
         Description:    Update filter buffer and return new filter output.
     
-        Params:         samp:           New data sample
+        Params:         samp:           New data sample (or array of one
+                                            sample per channel)
         
-        Returns:        filtSamp:       Filter output sample
+        Returns:        filtSamp:       Filter output sample(s)
         """
-        self.shiftReg = np.roll(self.shiftReg,1)
-        self.shiftReg[0] = samp
-        filtSamp = sum(self.shiftReg*self.taps)
+        if (self.outFmt is not None):
+            samp = self.__fixedIn(samp)
+        self.__fitState(np.shape(samp),samp)
+        if (self.__ind == 0):
+            self.__ind = self.length-1
+        else:
+            self.__ind -= 1
+        self.__buf[...,self.__ind] = samp
+        self.__buf[...,self.__ind+self.length] = samp
+        if (self.outFmt is not None):
+            accum = np.dot(self.__buf[...,self.__ind:self.__ind+self.length],
+                            self.__intTaps)
+            return self.outFmt.quantize(accum,self.outShift)
+        filtSamp = np.dot(self.__buf[...,self.__ind:self.__ind+self.length],
+                            self.taps)*self.scale_mult*self.scale_accum
         return filtSamp
 
     def clear(self):
@@ -45,24 +106,363 @@ class FIR:
         
         Returns:        None
         """
-        self.shiftReg = np.zeros(self.length)
+        self.__buf = np.zeros(2*self.length,dtype=self.__dtype)
+        self.__ind = 0
 
     def calc(self,data):
         """
-        Description:    Applies FIR filter to input data array.
+        Description:    Applies FIR filter to input data array. Clears shift
+                            register prior to filtering.
     
         Params:         data:       Input data array to be filtered
         
         Returns:        filtData:   Filtered data of same size as input 
         """
-        filtData = np.zeros(data.size)
         self.clear()
-        for ii in range(0,data.size):
-            self.shiftReg = np.roll(self.shiftReg,1)
-            self.shiftReg[0] = data[ii]
-            filtData[ii] = sum(self.shiftReg*self.taps*self.scale_mult)*self.scale_accum
+        return self.process(data)
+
+    def process(self,data):
+        """
+        Description:    Applies FIR filter to a block of input data. Shift
+                            register is carried between calls so a long
+                            signal can be filtered in consecutive blocks.
+                            Output matches calling update() on each sample.
+                            Data may be real or complex. A 2-D array of
+                            shape (channels,samples) filters every channel
+                            in one call with a shift register per channel
+                            (state is reset if the channel count changes).
+    
+        Params:         data:       Input data block to be filtered
+        
+        Returns:        filtData:   Filtered data of same shape as input 
+        """
+        data = np.asarray(data)
+        if (self.outFmt is not None):
+            data = self.__fixedIn(data)
+        self.__fitState(data.shape[:-1],data)
+        if (data.shape[-1] == 0):
+            return np.zeros(data.shape,dtype=self.__buf.dtype)
+        # Prepend shift register history (oldest first) to the new block
+        ext = np.concatenate((self.shiftReg[...,0:self.length-1][...,::-1],
+                                data),axis=-1)
+        if (self.outFmt is not None):
+            # Bit-true int64 multiply/accumulate of the whole block
+            accum = self.__directConv(ext,self.__intTaps)
+            self.shiftReg = ext[...,:-self.length-1:-1]
+            return self.outFmt.quantize(accum,self.outShift)
+        elif self.__useFft(data.shape[-1]):
+            filtData = self.__fftConv(ext)
+        else:
+            filtData = self.__directConv(ext,self.taps*self.scale_mult)
+        filtData = filtData*self.scale_accum
+        self.shiftReg = ext[...,:-self.length-1:-1]
         return filtData
 
+    def __fitState(self,chanShape,data):
+        # Size shift register for channel shape and promote to complex
+        if (self.__buf.shape[:-1] != chanShape):
+            self.__buf = np.zeros(chanShape+(2*self.length,),
+                                    dtype=self.__buf.dtype)
+            self.__ind = 0
+        if (np.iscomplexobj(data) & (not np.iscomplexobj(self.__buf))):
+            self.__buf = self.__buf.astype(complex)
+
+    def __fixedIn(self,data):
+        if (self.inFmt is not None):
+            return self.inFmt.quantize(data)
+        return np.asarray(data).astype(np.int64)
+
+    def __directConv(self,ext,taps):
+        if (ext.ndim == 1):
+            return np.convolve(ext,taps,'valid')
+        # Multichannel: strided window view of every channel times the
+        # reversed taps, so there is no Python loop over channels
+        windows = np.lib.stride_tricks.sliding_window_view(ext,self.length,
+                                                            axis=-1)
+        return np.matmul(windows,taps[::-1])
+
+    def __useFft(self,numSamps):
+        if (self.method == 'fft'):
+            return True
+        elif (self.method == 'auto'):
+            return (self.length >= self.FFT_TAPS) & (numSamps >= self.length)
+        return False
+
+    def __fftConv(self,ext):
+        # Overlap-save: each nfft frame yields nfft-length+1 valid outputs
+        numOut = ext.shape[-1] - self.length + 1
+        nfft = int(2**np.ceil(np.log2(8*self.length)))
+        nfft = min(nfft,int(2**np.ceil(np.log2(numOut+self.length-1))))
+        step = nfft - self.length + 1
+        numFrames = int(np.ceil(numOut/step))
+        isCplx = np.iscomplexobj(ext) | np.iscomplexobj(self.taps)
+        key = (nfft,isCplx)
+        if key not in self.__tapsFft:
+            if isCplx:
+                self.__tapsFft[key] = np.fft.fft(self.taps*self.scale_mult,nfft)
+            else:
+                self.__tapsFft[key] = np.fft.rfft(self.taps*self.scale_mult,
+                                                    nfft)
+        tapsFft = self.__tapsFft[key]
+
+        pad = np.zeros(ext.shape[:-1]+(numFrames*step+self.length-1-
+                        ext.shape[-1],),dtype=ext.dtype)
+        ext = np.concatenate((ext,pad),axis=-1)
+        frames = np.lib.stride_tricks.sliding_window_view(ext,nfft,axis=-1)
+        frames = frames[...,::step,:]
+        filtData = np.zeros(ext.shape[:-1]+(numFrames,step),
+                            dtype=tapsFft.dtype if isCplx else float)
+        for ii in range(0,numFrames,self.__FFT_BATCH):
+            batch = frames[...,ii:ii+self.__FFT_BATCH,:]
+            if isCplx:
+                y = np.fft.ifft(np.fft.fft(batch,axis=-1)*tapsFft,axis=-1)
+            else:
+                y = np.fft.irfft(np.fft.rfft(batch,axis=-1)*tapsFft,nfft,
+                                    axis=-1)
+            filtData[...,ii:ii+self.__FFT_BATCH,:] = y[...,self.length-1:]
+        filtData = filtData.reshape(ext.shape[:-1]+(numFrames*step,))
+        return filtData[...,0:numOut]
+
+class FIRDecim:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    Implements polyphase decimating FIR filter. Only every
+                        decimRate-th filter output is computed. Output is
+                        produced on the decimRate-th input sample, so it
+                        matches FIR(taps) output decimated starting at index
+                        decimRate-1.
+    
+    Attributes:     taps:       Filter taps
+                    decimRate:  Integer decimation rate
+                    length:     Length of filter
+                    shiftReg:   Filter shift register
+                    decimCnt:   Decimation counter (counts input samples)
+    
+    Methods:        update(newVal): Update filter buffer and return output
+                    clear():        Clear filter shift register and counter
+                    calc(data):     Return filtered, decimated data array
+                    process(data):  Filter and decimate data block, keeping
+                                        state between calls
+    """
+    def __init__(self, taps, decimRate):
+        self.taps = taps
+        self.decimRate = int(decimRate)
+        self.length = taps.size
+        self.clear()
+
+    @property
+    def shiftReg(self):
+        # Newest sample first
+        return self.__buf[self.__ind:self.__ind+self.length]
+
+    @shiftReg.setter
+    def shiftReg(self,value):
+        self.__buf = np.concatenate((value,value))
+        self.__ind = 0
+
+    def update(self,samp):
+        """
+        Description:    Update filter buffer and return filter output. Filter
+                            output is only computed when valid.
+    
+        Params:         samp:           New data sample
+        
+        Returns:        filtOut:        Filter output sample (held between
+                                            valid outputs)
+                        filtOutValid:   Valid output flag
+        """
+        self.__buf = _fitComplex(self.__buf,samp)
+        if (self.__ind == 0):
+            self.__ind = self.length-1
+        else:
+            self.__ind -= 1
+        self.__buf[self.__ind] = samp
+        self.__buf[self.__ind+self.length] = samp
+        self.decimCnt += 1
+        if (self.decimCnt == self.decimRate):
+            self.filtOut = np.dot(self.shiftReg,self.taps)
+            self.decimCnt = 0
+            filtOutValid = 1
+        else:
+            filtOutValid = 0
+        return (self.filtOut,filtOutValid)
+
+    def clear(self):
+        """
+        Description:    Clear filter shift register (zeros) and decimation
+                            counter
+    
+        Params:         None
+        
+        Returns:        None
+        """
+        # Circular buffer holds each sample twice so shiftReg is always a
+        # contiguous view starting at the write index
+        self.__buf = np.zeros(2*self.length)
+        self.__ind = 0
+        self.decimCnt = 0
+        self.filtOut = 0
+
+    def calc(self,data):
+        """
+        Description:    Applies decimating filter to input data array. Clears
+                            state prior to filtering.
+    
+        Params:         data:       Input data array to be filtered
+        
+        Returns:        filtData:   Filtered data of size
+                                        floor(data.size/decimRate)
+        """
+        self.clear()
+        return self.process(data)
+
+    def process(self,data):
+        """
+        Description:    Applies decimating filter to a block of input data.
+                            Shift register and decimation phase are carried
+                            between calls.
+    
+        Params:         data:       Input data block to be filtered
+        
+        Returns:        filtData:   Filtered data (one sample per
+                                        decimRate inputs)
+        """
+        data = np.asarray(data)
+        M = self.decimRate
+        first = M - self.decimCnt - 1
+        self.decimCnt = (self.decimCnt + data.size) % M
+        if (data.size == 0):
+            return np.zeros(0)
+        ext = np.concatenate((self.shiftReg[0:self.length-1][::-1],data))
+        self.shiftReg = ext[:-self.length-1:-1].copy()
+        numOut = max(0,int(np.ceil((data.size-first)/M)))
+        if (numOut == 0):
+            return np.zeros(0)
+        # Sum over polyphase branches: branch r filters every M-th sample
+        # with taps[r::M], so only kept outputs are computed
+        start = first + self.length - 1
+        filtData = 0
+        for r in range(0,min(M,self.length)):
+            base = start - r
+            branch = np.convolve(ext[base % M::M],self.taps[r::M])
+            filtData = filtData + branch[base//M:base//M+numOut]
+        self.filtOut = filtData[-1]
+        return filtData
+
+class FIRInterp:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    Implements polyphase interpolating FIR filter. Equivalent
+                        to zero stuffing input by interpRate followed by
+                        FIR(taps), without multiplying the stuffed zeros.
+                        Scale taps by interpRate for unity passband gain.
+    
+    Attributes:     taps:       Filter taps
+                    interpRate: Integer interpolation rate
+                    length:     Length of filter
+                    shiftReg:   Input sample shift register
+    
+    Methods:        update(newVal): Update filter buffer and return outputs
+                    clear():        Clear filter shift register
+                    calc(data):     Return interpolated data array
+                    process(data):  Interpolate data block, keeping state
+                                        between calls
+    """
+    def __init__(self, taps, interpRate):
+        self.taps = taps
+        self.interpRate = int(interpRate)
+        self.length = taps.size
+        # Polyphase taps, row p holds taps[p::interpRate] (zero padded)
+        numBranch = int(np.ceil(self.length/self.interpRate))
+        tapsPad = np.zeros(numBranch*self.interpRate,dtype=taps.dtype)
+        tapsPad[0:self.length] = taps
+        self.__polyTaps = tapsPad.reshape(numBranch,self.interpRate).T.copy()
+        self.__numBranch = numBranch
+        self.clear()
+
+    @property
+    def shiftReg(self):
+        # Newest sample first
+        return self.__buf[self.__ind:self.__ind+self.__numBranch]
+
+    @shiftReg.setter
+    def shiftReg(self,value):
+        self.__buf = np.concatenate((value,value))
+        self.__ind = 0
+
+    def update(self,samp):
+        """
+        Description:    Update filter buffer and return interpRate outputs.
+    
+        Params:         samp:       New data sample
+        
+        Returns:        filtOut:    Array of interpRate output samples
+        """
+        self.__buf = _fitComplex(self.__buf,samp)
+        if (self.__ind == 0):
+            self.__ind = self.__numBranch-1
+        else:
+            self.__ind -= 1
+        self.__buf[self.__ind] = samp
+        self.__buf[self.__ind+self.__numBranch] = samp
+        filtOut = np.dot(self.__polyTaps,self.shiftReg)
+        return filtOut
+
+    def clear(self):
+        """
+        Description:    Clear filter shift register (zeros)
+    
+        Params:         None
+        
+        Returns:        None
+        """
+        # Circular buffer holds each sample twice (see FIRDecim)
+        self.__buf = np.zeros(2*self.__numBranch)
+        self.__ind = 0
+
+    def calc(self,data):
+        """
+        Description:    Applies interpolating filter to input data array.
+                            Clears shift register prior to filtering.
+    
+        Params:         data:       Input data array to be interpolated
+        
+        Returns:        filtData:   Interpolated data of size
+                                        data.size*interpRate
+        """
+        self.clear()
+        return self.process(data)
+
+    def process(self,data):
+        """
+        Description:    Applies interpolating filter to a block of input data.
+                            Shift register is carried between calls.
+    
+        Params:         data:       Input data block to be interpolated
+        
+        Returns:        filtData:   Interpolated data of size
+                                        data.size*interpRate
+        """
+        data = np.asarray(data)
+        if (data.size == 0):
+            return np.zeros(0)
+        numBranch = self.__numBranch
+        ext = np.concatenate((self.shiftReg[0:numBranch-1][::-1],data))
+        self.shiftReg = ext[:-numBranch-1:-1].copy()
+        filtData = np.zeros((data.size,self.interpRate),
+                            dtype=np.result_type(ext,self.taps))
+        for p in range(0,self.interpRate):
+            filtData[:,p] = np.convolve(ext,self.__polyTaps[p],'valid')
+        return filtData.reshape(-1)
+
+def _fitComplex(buf,samp):
+    # Promote real shift register buffer to complex for complex input
+    if (np.iscomplexobj(samp) & (not np.iscomplexobj(buf))):
+        return buf.astype(complex)
+    return buf
+
 """
 # EXAMPLE:
 import matplotlib.pyplot as plt
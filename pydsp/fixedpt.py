@@ -0,0 +1,117 @@
+import numpy as np
+
+class FixedPt:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    Fixed point quantizer. Converts float or integer data to
+                        signed bitW-bit integers (int64) using selectable
+                        rounding and overflow handling. Counts the number of
+                        samples that saturate or wrap.
+
+    Attributes:     bitW:       Word width in bits (signed)
+                    rounding:   (*optional) Rounding mode. 'trunc' (toward
+                                    zero), 'floor', 'round' (half up) or
+                                    'convergent' (half to even).
+                                    Default = 'round'
+                    overflow:   (*optional) Overflow mode. 'saturate' or
+                                    'wrap'. Default = 'saturate'
+                    symmetric:  (*optional) Set to True to saturate at
+                                    +/-(2**(bitW-1)-1). Default = False
+                    satCnt:     # of samples saturated
+                    ovfCnt:     # of samples wrapped
+
+    Methods:        quantize(data,shift):   Scale by 2**-shift and quantize
+                    clear():                Clear saturation/overflow counts
+    """
+    def __init__(self,bitW,rounding='round',overflow='saturate',
+                    symmetric=False):
+        self.bitW = bitW
+        self.rounding = rounding.lower()
+        self.overflow = overflow.lower()
+        self.symmetric = symmetric
+        if (self.rounding not in ('trunc','floor','round','convergent')):
+            print('Error: Invalid rounding mode')
+        if (self.overflow not in ('saturate','wrap')):
+            print('Error: Invalid overflow mode')
+        self.maxVal = 2**(bitW-1)-1
+        if (symmetric == True):
+            self.minVal = -self.maxVal
+        else:
+            self.minVal = -self.maxVal-1
+        self.satCnt = 0
+        self.ovfCnt = 0
+
+    def quantize(self,data,shift=0):
+        """
+        Description:    Scale input by 2**-shift, round and saturate or wrap
+                            to bitW bits. Integer inputs are shifted with
+                            integer arithmetic so results are bit-true.
+
+        Params:         data:       Input sample or array (float or integer)
+                        shift:      (*optional) # of bits to shift right
+                                        (negative shifts left). Default = 0
+
+        Returns:        dataOut:    Quantized sample (int) or array (int64)
+        """
+        dataIn = np.asarray(data)
+        if np.issubdtype(dataIn.dtype,np.integer):
+            dataOut = self.__shiftInt(dataIn.astype(np.int64),shift)
+        else:
+            dataOut = self.__roundFloat(dataIn*2.0**-shift)
+
+        outRange = (dataOut > self.maxVal) | (dataOut < self.minVal)
+        numOut = int(np.count_nonzero(outRange))
+        if (numOut > 0):
+            if (self.overflow == 'wrap'):
+                self.ovfCnt += numOut
+                dataOut = (dataOut - self.minVal) % 2**self.bitW + self.minVal
+            else:
+                self.satCnt += numOut
+                dataOut = np.clip(dataOut,self.minVal,self.maxVal)
+        if (dataOut.ndim == 0):
+            return int(dataOut)
+        return dataOut
+
+    def clear(self):
+        """
+        Description:    Clear saturation and overflow counts
+
+        Params:         None
+
+        Returns:        None
+        """
+        self.satCnt = 0
+        self.ovfCnt = 0
+
+    def __roundFloat(self,x):
+        if (self.rounding == 'trunc'):
+            x = np.trunc(x)
+        elif (self.rounding == 'floor'):
+            x = np.floor(x)
+        elif (self.rounding == 'convergent'):
+            x = np.rint(x)
+        else:
+            x = np.floor(x+0.5)
+        return x.astype(np.int64)
+
+    def __shiftInt(self,x,shift):
+        if (shift <= 0):
+            return x << -shift
+        half = 1 << (shift-1)
+        if (self.rounding == 'trunc'):
+            return np.where(x < 0,-((-x) >> shift),x >> shift)
+        elif (self.rounding == 'floor'):
+            return x >> shift
+        elif (self.rounding == 'convergent'):
+            return (x + half - 1 + ((x >> shift) & 1)) >> shift
+        return (x + half) >> shift
+
+"""
+# EXAMPLE:
+q = FixedPt(8,'convergent')
+x = np.array([0.5,1.5,2.5,-0.5,300.2,-300.7])
+print(q.quantize(x))
+print(q.quantize(np.array([4,12,20,-4]),3))
+print(q.satCnt)
+"""
@@ -9,14 +9,42 @@ class IntDump:
     
     Attributes:     length:         Length of moving average filter
                     dumpCnt:        Dump counter (counts samples)
+                    inFmt:          (*optional) FixedPt input format.
+                                        Default = None
+                    outFmt:         (*optional) FixedPt output format.
+                                        Enables bit-true mode: int64 sum is
+                                        shifted right by outShift instead of
+                                        divided by length, and output is held
+                                        between dumps. Default = None
+                    outShift:       (*optional) # of bits sum is shifted
+                                        right by prior to outFmt. Default = 0
+                    offset:         (*optional) # of initial input samples
+                                        to discard before integrating, used
+                                        to align dumps to symbol boundaries.
+                                        Default = 0
+                    dlyCnt:         # of input samples left to discard
     
     Methods:        update(newVal): Update filter buffer and return new output
                     clear():        Clear filter buffer
                     calc(data):     Return filtered data array
+                    process(data):  Integrate and dump data block, keeping
+                                        partial window and dump phase
+                                        between calls
     """
-    def __init__(self, length):
+    def __init__(self, length, inFmt=None, outFmt=None, outShift=0, offset=0):
         self.length = length
-        self.__buf = np.zeros(length)
+        self.offset = offset
+        self.dlyCnt = offset
+        self.inFmt = inFmt
+        self.outFmt = outFmt
+        self.outShift = outShift
+        if (outFmt is None):
+            self.__dtype = float
+        else:
+            self.__dtype = np.int64
+        self.__buf = np.zeros(length,dtype=self.__dtype)
+        self.__sum = 0
+        self.__dumpOut = 0
         self.dumpCnt = 0
 
     def update(self,newVal):
@@ -28,42 +56,107 @@ class IntDump:
         Returns:        filtOut:        Filter output sample
                         filtOutValid:   Valid output flag
         """
-        filtOut = sum(self.__buf)/self.length
-        self.__buf[1:] = self.__buf[0:-1]
-        self.__buf[0] = newVal
+        if (self.dlyCnt > 0):
+            self.dlyCnt -= 1
+            if (self.outFmt is not None):
+                return (self.__dumpOut,0)
+            return (self.__sum/self.length,0)
+        if (self.outFmt is not None):
+            return self.__updateFixed(newVal)
+        # dumpCnt doubles as circular buffer write index. Running sum is
+        # resynced from the (time ordered) buffer on every dump.
+        filtOut = self.__sum/self.length
+        self.__sum += newVal - self.__buf[self.dumpCnt]
+        self.__buf[self.dumpCnt] = newVal
         self.dumpCnt += 1
         if (self.dumpCnt == self.length):
-            filtOut = sum(self.__buf)/self.length
+            self.__sum = sum(self.__buf[::-1])
+            filtOut = self.__sum/self.length
             self.dumpCnt = 0
             filtOutValid = 1
         else:
             filtOutValid = 0
         return (filtOut,filtOutValid)
 
+    def __updateFixed(self,newVal):
+        if (self.inFmt is not None):
+            newVal = self.inFmt.quantize(newVal)
+        self.__buf[self.dumpCnt] = newVal
+        self.dumpCnt += 1
+        if (self.dumpCnt == self.length):
+            self.__sum = np.sum(self.__buf)
+            self.__dumpOut = self.outFmt.quantize(self.__sum,self.outShift)
+            self.dumpCnt = 0
+            return (self.__dumpOut,1)
+        return (self.__dumpOut,0)
+
     def clear(self):
         """
-        Description:    Clear filter buffer (zeros) and dump counter
+        Description:    Clear filter buffer (zeros), dump counter and offset
+                            delay
     
         Params:         None
         
         Returns:        None
         """
-        self.__buf = np.zeros[self.length]
+        self.__buf = np.zeros(self.length,dtype=self.__dtype)
+        self.__sum = 0
+        self.__dumpOut = 0
         self.dumpCnt = 0
+        self.dlyCnt = self.offset
 
     def calc(self,data):
         """
         Description:    Implement integrate dump filter on input data array.
+                            Clears filter prior to filtering.
     
         Params:         data:       Input data array to be filtered
         
-        Returns:        filtData:   Filt array of size floor(data.size/length) 
+        Returns:        filtData:   Filt array of size 
+                                        floor((data.size-offset)/length) 
+        """
+        self.clear()
+        return self.process(data)
+
+    def process(self,data):
+        """
+        Description:    Implement integrate dump filter on a block of input
+                            data. Partial window and dump phase are carried
+                            between calls, so outputs match calling update()
+                            on each sample.
+    
+        Params:         data:       Input data block to be filtered
+        
+        Returns:        filtData:   Array with one output per completed dump
         """
-        filtData = np.zeros(int(np.floor(data.size/self.length)))
-        for ii in range(0,filtData.size):
-            filtData[ii] = sum(data[ii*self.length:ii*self.length+
-                                self.length])/self.length
-        return filtData
+        data = np.asarray(data)
+        numSkip = min(self.dlyCnt,data.size)
+        self.dlyCnt -= numSkip
+        data = data[numSkip:]
+        if (self.outFmt is not None):
+            if (self.inFmt is not None):
+                data = self.inFmt.quantize(data)
+            data = data.astype(np.int64)
+
+        # Partial window (time order) followed by new data
+        ext = np.concatenate((self.__buf[0:self.dumpCnt],data))
+        numOut = ext.size//self.length
+        sums = np.sum(ext[0:numOut*self.length].reshape(numOut,self.length),
+                        axis=1)
+
+        # Buffer holds last length samples with newest at dumpCnt-1
+        hist = np.concatenate((self.__buf[self.dumpCnt:],
+                                self.__buf[0:self.dumpCnt],data))
+        self.dumpCnt = ext.size % self.length
+        self.__buf = np.roll(hist[hist.size-self.length:],self.dumpCnt)
+        self.__buf = self.__buf.astype(self.__dtype)
+        if (self.outFmt is not None):
+            filtData = self.outFmt.quantize(sums,self.outShift)
+            if (numOut > 0):
+                self.__dumpOut = int(filtData[-1])
+            return filtData
+        self.__sum = np.sum(self.__buf)
+        return sums/self.length
 
 """
 # EXAMPLE:
@@ -0,0 +1,196 @@
+import numpy as np
+from .bitgen import GenPn
+from .noisegen import EbNo
+from .agc import AGC
+from .fixedpt import FixedPt
+from .qtrratedwncvt import QtrRateDwnCvt
+from .fir import FIR
+from .intdump import IntDump
+
+class BpskSim:
+    """
+    Designer:       Andrew Carroll
+
+    Description:    BPSK link simulator. PN bits modulate a carrier at
+                        fSamp/4, noise is added for the target Eb/No, then
+                        AGC with bitW quantization, quarter rate down
+                        conversion, I/Q lowpass FIR with bitGain, and
+                        integrate and dump bit decisions. calc() runs the
+                        chain in blocks of chunkSize samples (streaming
+                        modes of each block); calcRef() runs the same
+                        chain one sample at a time as a reference.
+    
+    Attributes:     fSamp:      (*optional) Sample rate (Hz). Default = 10e6
+                    fBit:       (*optional) Bit rate (Hz). Default = 100e3
+                    fCar:       (*optional) Carrier frequency (Hz).
+                                    Default = 2.5e6
+                    ebNo:       (*optional) Eb/No (dB). Default = 4
+                    numBits:    (*optional) # of bits to send. Default = 5000
+                    bitW:       (*optional) Receiver word width (bits).
+                                    Default = 10
+                    bitGain:    (*optional) Gain after lowpass FIR.
+                                    Default = 4
+                    phOffset:   (*optional) Carrier phase (rad).
+                                    Default = pi/2
+                    sampDly:    (*optional) # of samples skipped before the
+                                    first integrate and dump (aligns dumps
+                                    to bits after FIR delay). Default = 50
+                    taps:       (*optional) Lowpass FIR taps.
+                                    Default = 100 tap hamming windowed sinc,
+                                    cutoff 0.03*fSamp/2
+                    pnPow2:     (*optional) PN sequence power. Default = 9
+                    agcLength:  (*optional) AGC buffer length. Default = 100
+                    agcSigma:   (*optional) AGC # of std dev in full scale.
+                                    Default = 3
+                    seed:       (*optional) Noise seed (see AWGN).
+                                    Default = None (global np.random state)
+                    chunkSize:  (*optional) # of samples per block in
+                                    calc(). Default = 65536
+    
+    Methods:        calc():     Run vectorized simulation
+                    calcRef():  Run per-sample reference simulation
+    """
+    def __init__(self,fSamp=10e6,fBit=100e3,fCar=2.5e6,ebNo=4,numBits=5000,
+                    bitW=10,bitGain=4,phOffset=np.pi/2,sampDly=50,taps=None,
+                    pnPow2=9,agcLength=100,agcSigma=3,seed=None,
+                    chunkSize=65536):
+        self.fSamp = fSamp
+        self.fBit = fBit
+        self.fCar = fCar
+        self.ebNo = ebNo
+        self.numBits = numBits
+        self.bitW = bitW
+        self.bitGain = bitGain
+        self.phOffset = phOffset
+        self.sampDly = sampDly
+        if (taps is None):
+            taps = _lowpassTaps(100,0.03)
+        self.taps = taps
+        self.pnPow2 = pnPow2
+        self.agcLength = agcLength
+        self.agcSigma = agcSigma
+        self.seed = seed
+        self.chunkSize = chunkSize
+        self.sampsPerBit = int(fSamp/fBit)
+        self.numSamps = self.sampsPerBit*numBits
+        self.fullScale = 2**(bitW-1)-1
+
+    def calc(self):
+        """
+        Description:    Run simulation in blocks of chunkSize samples
+
+        Params:         None
+
+        Returns:        ber:        Bit error rate
+                        sigs:       Dictionary of signals. 't': sample
+                                        times, 'sigIn': quantized AGC
+                                        output, 'i'/'q': quantized FIR
+                                        outputs, 'iDump'/'qDump': integrate
+                                        and dump outputs, 'bitSent'/
+                                        'bitRec': compared bits, 'numErr':
+                                        # of bit errors
+        """
+        bitSeq,noiseGen,agc,qtrRate,filt,intDumpI,intDumpQ = self.__build()
+        # Receiver quantization, int(np.clip(x,-fullScale,fullScale))
+        quant = FixedPt(self.bitW,'trunc',symmetric=True)
+        sigs = {'t':[],'sigIn':[],'i':[],'q':[],'iDump':[],'qDump':[]}
+        for start in range(0,self.numSamps,self.chunkSize):
+            ind = np.arange(start,min(start+self.chunkSize,self.numSamps))
+            t = ind/self.fSamp
+            # First bit lasts sampsPerBit-1 samples (GenPn.getSamp timing)
+            bits = bitSeq[(ind+1)//self.sampsPerBit]
+            sigIn = np.sin(2*np.pi*self.fCar*t+self.phOffset)*bits
+            sigIn = sigIn + noiseGen.getNoise(ind.size)
+            sigIn = quant.quantize(agc.process(sigIn))
+            iSig,qSig = qtrRate.process(sigIn)
+            iqSig = filt.process(np.stack((iSig,qSig)))
+            iqSig = quant.quantize(iqSig*self.bitGain)
+            sigs['t'].append(t)
+            sigs['sigIn'].append(sigIn)
+            sigs['i'].append(iqSig[0])
+            sigs['q'].append(iqSig[1])
+            sigs['iDump'].append(intDumpI.process(iqSig[0]))
+            sigs['qDump'].append(intDumpQ.process(iqSig[1]))
+        for key in sigs:
+            sigs[key] = np.concatenate(sigs[key])
+        return self.__score(bitSeq,sigs)
+
+    def calcRef(self):
+        """
+        Description:    Run simulation one sample at a time through the
+                            update() methods (slow reference for calc())
+
+        Params:         None
+
+        Returns:        ber:        Bit error rate
+                        sigs:       Dictionary of signals (see calc)
+        """
+        bitSeq,noiseGen,agc,qtrRate,filt,intDumpI,intDumpQ = self.__build()
+        bitGen = GenPn(self.pnPow2,self.sampsPerBit)
+        firFiltI = FIR(self.taps)
+        firFiltQ = FIR(self.taps)
+        fs = self.fullScale
+        sigs = {'t':np.zeros(self.numSamps),'sigIn':np.zeros(self.numSamps),
+                'i':np.zeros(self.numSamps),'q':np.zeros(self.numSamps),
+                'iDump':[],'qDump':[]}
+        for ii in range(0,self.numSamps):
+            t = ii*1/self.fSamp
+            sigIn = np.sin(2*np.pi*self.fCar*t+self.phOffset)
+            sigIn = sigIn*bitGen.getSamp() + noiseGen.getSamp()
+            sigIn = int(np.clip(agc.update(sigIn),-fs,fs))
+            iSig,qSig = qtrRate.update(sigIn)
+            iSig = int(np.clip(firFiltI.update(iSig)*self.bitGain,-fs,fs))
+            qSig = int(np.clip(firFiltQ.update(qSig)*self.bitGain,-fs,fs))
+            sigs['t'][ii] = t
+            sigs['sigIn'][ii] = sigIn
+            sigs['i'][ii] = iSig
+            sigs['q'][ii] = qSig
+            iSig,iSigVal = intDumpI.update(iSig)
+            qSig,qSigVal = intDumpQ.update(qSig)
+            if (iSigVal == 1):
+                sigs['iDump'].append(iSig)
+                sigs['qDump'].append(qSig)
+        sigs['iDump'] = np.array(sigs['iDump'])
+        sigs['qDump'] = np.array(sigs['qDump'])
+        return self.__score(bitSeq,sigs)
+
+    def __build(self):
+        # Bit symbol of each bit period (initial PN output, then sequence)
+        pn = GenPn(self.pnPow2).getArr(self.numBits)
+        bitSeq = np.concatenate(([1.0],pn))
+        noiseGen = EbNo(self.fBit,self.fSamp,self.ebNo,seed=self.seed)
+        agc = AGC(self.agcLength,self.fullScale,self.agcSigma)
+        qtrRate = QtrRateDwnCvt()
+        filt = FIR(self.taps)
+        intDumpI = IntDump(self.sampsPerBit,offset=self.sampDly)
+        intDumpQ = IntDump(self.sampsPerBit,offset=self.sampDly)
+        return bitSeq,noiseGen,agc,qtrRate,filt,intDumpI,intDumpQ
+
+    def __score(self,bitSeq,sigs):
+        bitRec = np.sign(sigs['iDump'])
+        bitSent = bitSeq[0:bitRec.size]
+        numErr = np.sum(np.abs((bitSent*bitRec - 1)/2))
+        sigs['bitSent'] = bitSent
+        sigs['bitRec'] = bitRec
+        sigs['numErr'] = numErr
+        ber = numErr/max(bitRec.size,1)
+        return ber,sigs
+
+def _lowpassTaps(numTaps,cutoff):
+    # Hamming windowed sinc lowpass, unity DC gain (cutoff relative to
+    # Nyquist, same as scipy.signal.firwin defaults)
+    n = np.arange(numTaps) - (numTaps-1)/2
+    taps = cutoff*np.sinc(cutoff*n)*np.hamming(numTaps)
+    return taps/np.sum(taps)
+
+"""
+# EXAMPLE:
+import matplotlib.pyplot as plt
+sim = BpskSim(ebNo=4,seed=1)
+ber,sigs = sim.calc()
+print(ber,sigs['numErr'])
+plt.figure()
+plt.plot(sigs['t'][0:2000],sigs['i'][0:2000],'b',
+            sigs['t'][0:2000],sigs['q'][0:2000],'r')
+plt.show()
+"""
@@ -1,4 +1,4 @@
-#import numpy as np
+import numpy as np
 
 class Accum():
     """
@@ -56,12 +56,130 @@ class NCO(Accum):
     Designer:       Andrew Carroll
 
     Description:    Implements Numerically Controlled Oscillator. Special
-                    Accum subclass with rollOver always set to True. 
+                    Accum subclass with rollOver always set to True. Phase
+                    accumulator (0 to maxVal) maps to 0 to 2*pi and is
+                    converted to sin/cos through a cached lookup table
+                    addressed by the top lutBits of phase.
     
     Attributes:     maxVal:     Maximum value of accumulator
+                    lutBits:    (*optional) # of phase bits kept (after
+                                    truncation) to address the sin/cos lookup
+                                    table. Default = 12
                     
     Methods:        update(incrVal):        Add incrVal to accumulator
                     clear():                Clear accumulator (set to 0)
+                    calc(incrVal,numSamps): Get block of phases
+                    calcSinCos(incrVal,numSamps): Get block of cos/sin
+                    phaseToAmp(phase):      Convert phase(s) to cos/sin
     """
-    def __init__(self,maxVal):
+    # Lookup tables shared by all NCOs, keyed by lutBits
+    __LUT = {}
+
+    def __init__(self,maxVal,lutBits=12):
         super(NCO, self).__init__(maxVal)
+        self.lutBits = lutBits
+        if lutBits not in NCO.__LUT:
+            ph = 2*np.pi*np.arange(0,2**lutBits)/2**lutBits
+            NCO.__LUT[lutBits] = (np.cos(ph),np.sin(ph))
+        self.__cosLut,self.__sinLut = NCO.__LUT[lutBits]
+
+    def calc(self,incrVal,numSamps=None):
+        """
+        Description:    Get block of phases. Same as calling update() for
+                            each sample, continuing from the current
+                            accumulator value.
+
+        Params:         incrVal:    Frequency word (scalar) or array of
+                                        per-sample frequency words
+                        numSamps:   (*optional) # of samples if incrVal is a
+                                        scalar. Default = None
+
+        Returns:        phase:      Array of accumulator values
+        """
+        modulus = self.maxVal + 1
+        if (numSamps is None):
+            incr = np.asarray(incrVal)
+        else:
+            incr = np.full(numSamps,incrVal)
+        if (incr.size == 0):
+            return incr
+        if (np.issubdtype(incr.dtype,np.integer) & 
+                (int(modulus) == modulus)):
+            phase = self.__intPhase(incr.astype(np.int64),int(modulus))
+        else:
+            phase = np.mod(self.accum + np.cumsum(np.mod(incr,modulus)),
+                            modulus)
+        self.accum = phase[-1]
+        return phase
+
+    def __intPhase(self,incr,modulus):
+        if ((modulus & (modulus-1)) == 0):
+            # int64 cumsum may wrap modulo 2**64, which is harmless here
+            # since a power of two modulus divides 2**64
+            mask = modulus-1
+            return (int(self.accum) + np.cumsum(incr & mask)) & mask
+        # Other moduli: re-wrap every chunkLen samples so partial sums of
+        # wrapped increments stay below 2**63
+        incr = incr % modulus
+        chunkLen = max(1,(2**63-1)//modulus - 1)
+        phase = np.zeros(incr.size,dtype=np.int64)
+        accum = int(self.accum)
+        for st in range(0,incr.size,chunkLen):
+            seg = (accum + np.cumsum(incr[st:st+chunkLen])) % modulus
+            phase[st:st+seg.size] = seg
+            accum = int(seg[-1])
+        return phase
+
+    def calcSinCos(self,incrVal,numSamps=None):
+        """
+        Description:    Get block of cos/sin samples from lookup table
+
+        Params:         incrVal:    Frequency word (scalar) or array of
+                                        per-sample frequency words
+                        numSamps:   (*optional) # of samples if incrVal is a
+                                        scalar. Default = None
+
+        Returns:        cosOut:     cos(phase) array
+                        sinOut:     sin(phase) array
+        """
+        return self.phaseToAmp(self.calc(incrVal,numSamps))
+
+    def phaseToAmp(self,phase):
+        """
+        Description:    Convert phase (accumulator value) to cos/sin by
+                            truncating to lutBits and indexing lookup table
+
+        Params:         phase:      Phase sample or array (0 to maxVal)
+
+        Returns:        cosOut:     cos(phase)
+                        sinOut:     sin(phase)
+        """
+        modulus = self.maxVal + 1
+        phase = np.asarray(phase)
+        if (np.issubdtype(phase.dtype,np.integer) & 
+                (int(modulus) == modulus)):
+            modulus = int(modulus)
+            phaseBits = modulus.bit_length()-1
+            if (modulus == 2**phaseBits):
+                # Keep top lutBits of phase
+                if (phaseBits >= self.lutBits):
+                    ind = phase >> (phaseBits-self.lutBits)
+                else:
+                    ind = phase << (self.lutBits-phaseBits)
+            elif (modulus*2**self.lutBits < 2**63):
+                ind = (phase.astype(np.int64)*2**self.lutBits)//modulus
+            else:
+                # Exact Python integer arithmetic (product exceeds int64)
+                ind = (phase.astype(object)*2**self.lutBits)//modulus
+                ind = ind.astype(np.int64)
+        else:
+            ind = np.floor(phase*(2**self.lutBits/modulus)).astype(np.int64)
+        ind = ind & (2**self.lutBits-1)
+        return self.__cosLut[ind],self.__sinLut[ind]
+
+"""
+# EXAMPLE:
+nco = NCO(2**32-1,10)
+cosOut,sinOut = nco.calcSinCos(int(2**32*0.1),1000)
+print(cosOut[0:10])
+"""
@@ -5,17 +5,26 @@ class MovAvg:
     Designer:       Andrew Carroll
 
     Description:    Implements moving average filter. Functions in sample or
-                    array based modes.
+                    array based modes. Uses a running sum that is re-summed
+                    from the window every length samples (or exact integer
+                    accumulation for integer data) to avoid drift.
     
     Attributes:     length: length of moving average filter
     
     Methods:        update(newVal): Update filter buf and return new output
                     clear():        Clear filter buffer
                     calc(data):     Return filtered data array
+                    process(data):  Filter data block, keeping window
+                                        between calls
     """
+    # Min # of block samples between exact window re-sums in process()
+    __RESUM_LEN = 4096
+
     def __init__(self, length):
         self.length = length
         self.__buf = np.zeros(length)
+        self.__ind = 0
+        self.__sum = 0
 
     def update(self,newVal):
         """
@@ -25,9 +34,15 @@ class MovAvg:
         
         Returns:        filtData:   Filter output sample
         """
-        self.__buf[1:] = self.buf__[0:-2]
-        self.__buf[0] = newVal
-        return sum(self.__buf)/self.length
+        self.__sum += newVal - self.__buf[self.__ind]
+        self.__buf[self.__ind] = newVal
+        if (self.__ind == self.length-1):
+            self.__ind = 0
+            # Re-sum once per window to stop rounding errors accumulating
+            self.__sum = np.sum(self.__buf)
+        else:
+            self.__ind += 1
+        return self.__sum/self.length
 
     def clear(self):
         """
@@ -38,6 +53,8 @@ class MovAvg:
         Returns:        None
         """
         self.__buf = np.zeros(self.length)
+        self.__ind = 0
+        self.__sum = 0
 
     def calc(self,data):
         """
@@ -48,11 +65,40 @@ class MovAvg:
         Returns:        filtData:   Filter output array (same size as input)
         """
         self.clear()
-        filtData = np.zeros(data.size)
-        for ii in range(0,data.size):
-            self.__buf[1:] = self.__buf[0:-1]
-            self.__buf[0] = data[ii]
-            filtData[ii] = sum(self.__buf)/self.length
+        return self.process(data)
+
+    def process(self,data):
+        """
+        Description:    Implement moving average filter on a block of input
+                            data. Window is carried between calls so a long
+                            signal can be filtered in consecutive blocks.
+    
+        Params:         data:       Input data block to be filtered
+        
+        Returns:        filtData:   Filter output array (same size as input)
+        """
+        data = np.asarray(data)
+        numSamps = data.size
+        # Window in time order (oldest first) followed by new data
+        ext = np.concatenate((self.__buf[self.__ind:],self.__buf[0:self.__ind],
+                                data))
+        if np.issubdtype(data.dtype,np.integer):
+            # Exact integer accumulation
+            ext = ext.astype(np.int64)
+        diffs = ext[self.length:] - ext[0:numSamps]
+        if np.issubdtype(ext.dtype,np.integer):
+            filtData = (np.sum(ext[0:self.length]) + np.cumsum(diffs))/self.length
+        else:
+            # Restart cumsum from an exact window sum every segLen samples
+            filtData = np.zeros(numSamps)
+            segLen = max(self.length,self.__RESUM_LEN)
+            for ii in range(0,numSamps,segLen):
+                winSum = np.sum(ext[ii:ii+self.length])
+                filtData[ii:ii+segLen] = winSum + np.cumsum(diffs[ii:ii+segLen])
+            filtData = filtData/self.length
+        self.__buf = ext[numSamps:].astype(float)
+        self.__ind = 0
+        self.__sum = np.sum(self.__buf)
         return filtData
 
 """
@@ -1,21 +1,48 @@
 import numpy as np
+from .rng import makeRng
 
 class AWGN():
     """
     Designer:       Andrew Carroll
 
-    Description:    Additive white gaussian noise generator
+    Description:    Additive white gaussian noise generator. With a seed,
+                        small requests are served from a buffer of
+                        pre-drawn noise, giving the same values as one bulk
+                        draw from the stream. Without a seed, noise is drawn
+                        from the global np.random state per request (no
+                        draw-ahead, so other users of that state see the
+                        same sequence as before).
     
     Attributes:     rmsSig:     RMS of signal
                     snr:        Target SNR (dB)
+                    seed:       (*optional) int, SeedSequence or Generator
+                                    (see rng.spawn for parallel streams).
+                                    Default = None (global np.random state)
+                    dtype:      (*optional) Noise dtype, np.float32 or
+                                    np.float64. Default = np.float64
+                    bufSize:    (*optional) # of noise samples drawn per
+                                    buffer refill (seeded only).
+                                    Default = 4096
+                    rng:        numpy Generator (None if seed is None)
                     
     Methods:        addNoise(dataIn):       Add noise to input data
                     getNoise(numSamps):     Get noise samples
+                    getSamp():              Get single noise sample
     """
-    def __init__(self,rmsSig,snr):
+    def __init__(self,rmsSig,snr,seed=None,dtype=np.float64,bufSize=4096):
         # I don't fully understand why the +3dB is required. I believe it has
             # something to do with being a digital single-sided frequency spectrum
         self.sigmaN = rmsSig/10**((snr+3)/20)
+        self.dtype = dtype
+        if (seed is None):
+            self.rng = None
+        else:
+            self.rng = makeRng(seed)
+        self.bufSize = bufSize
+        # Noise drawn ahead (scaled by bufSigma), bufInd is next unused sample
+        self.__buf = np.zeros(0,dtype=dtype)
+        self.__bufInd = 0
+        self.__bufSigma = self.sigmaN
 
     def addNoise(self,dataIn):
         """
@@ -25,20 +52,87 @@ class AWGN():
 
         Returns:        dataOut:    Output sample(s) with noise added (float)
         """
-        dataOut = dataIn + np.random.normal(0,self.sigmaN,dataIn.size)
+        dataOut = dataIn + self.getNoise(np.shape(dataIn))
         return dataOut
 
     def getNoise(self,numSamps):
         """
         Description:    Get noise samples from gaussian distribution
 
-        Params:         numSamps:   # of noise samples to return
+        Params:         numSamps:   # of noise samples (or shape) to return
 
         Returns:        sampsOut:   Output sample or array
         """
-        sampsOut = np.random.normal(0,self.sigmaN,numSamps)
+        # Fast path: int count served from the buffer
+        if ((type(numSamps) is int) and
+                (numSamps <= self.__buf.size - self.__bufInd) and
+                (self.sigmaN == self.__bufSigma)):
+            ind = self.__bufInd
+            self.__bufInd = ind + numSamps
+            return self.__buf[ind:self.__bufInd]
+        isShape = not isinstance(numSamps,(int,np.integer))
+        if (isShape == True):
+            numTot = int(np.prod(numSamps))
+        else:
+            numTot = int(numSamps)
+        self.__checkSigma()
+        numAvail = self.__buf.size - self.__bufInd
+        if (self.rng is None):
+            sampsOut = self.__draw(numTot)
+        elif (numTot <= numAvail):
+            sampsOut = self.__buf[self.__bufInd:self.__bufInd+numTot]
+            self.__bufInd += numTot
+        else:
+            numNeed = numTot - numAvail
+            sampsOut = [self.__buf[self.__bufInd:]]
+            if (numNeed >= self.bufSize):
+                sampsOut.append(self.__draw(numNeed))
+                self.__buf = self.__buf[0:0]
+                self.__bufInd = 0
+            else:
+                self.__buf = self.__draw(self.bufSize)
+                sampsOut.append(self.__buf[0:numNeed])
+                self.__bufInd = numNeed
+            sampsOut = np.concatenate(sampsOut)
+        if (isShape == True):
+            sampsOut = sampsOut.reshape(numSamps)
         return sampsOut
 
+    def getSamp(self):
+        """
+        Description:    Get single noise sample from gaussian distribution
+
+        Params:         None
+
+        Returns:        sampOut:    Output sample
+        """
+        if (self.rng is None):
+            return self.__draw(1)[0]
+        self.__checkSigma()
+        if (self.__bufInd == self.__buf.size):
+            self.__buf = self.__draw(self.bufSize)
+            self.__bufInd = 0
+        sampOut = self.__buf[self.__bufInd]
+        self.__bufInd += 1
+        return sampOut
+
+    def __draw(self,numSamps):
+        # Unit variance noise scaled to sigmaN (buffer refills are scaled
+        # once here, so small requests are plain slices)
+        if (self.rng is None):
+            noise = np.random.standard_normal(numSamps).astype(self.dtype,
+                                                                copy=False)
+        else:
+            noise = self.rng.standard_normal(numSamps,dtype=self.dtype)
+        noise *= self.sigmaN
+        return noise
+
+    def __checkSigma(self):
+        # Rescale buffered noise if sigmaN was changed since it was drawn
+        if (self.sigmaN != self.__bufSigma):
+            self.__buf = self.__buf/self.__bufSigma*self.sigmaN
+            self.__bufSigma = self.sigmaN
+
 class EbNo(AWGN):
     """
     Designer:       Andrew Carroll
@@ -50,13 +144,18 @@ class EbNo(AWGN):
                     ebNo:       Target Eb/No (dB)
                     rmsSig:     (*optional) RMS signal energy. 
                                     Default = sqrt(2)/2
+                    seed:       (*optional) See AWGN. Default = None
+                    dtype:      (*optional) See AWGN. Default = np.float64
+                    bufSize:    (*optional) See AWGN. Default = 4096
                     
     Methods:        addNoise(dataIn):       Add noise to input data
                     getNoise(numSamps):     Get noise samples
+                    getSamp():              Get single noise sample
     """
-    def __init__(self,fData,fSamp,ebNo,rmsSig=.70710678):
+    def __init__(self,fData,fSamp,ebNo,rmsSig=.70710678,seed=None,
+                    dtype=np.float64,bufSize=4096):
         snr = ebNo - 10*np.log10(fSamp/fData)
-        super(EbNo, self).__init__(rmsSig,snr)
+        super(EbNo, self).__init__(rmsSig,snr,seed,dtype,bufSize)
 
 """
 # EXAMPLE (AWGN):
@@ -9,14 +9,27 @@ class PICtrl():
     Attributes:     pCoeff:     Proportional coefficient
                     iCoeff:     Integral coefficient
                     maxVal:     Max output value (+/-)
+                    antiWindup: (*optional) Set to True to clamp integral
+                                    accumulator at +/- maxVal.
+                                    Default = False
 
     Methods:        update(sampIn):     Update controller with new sample
                     clear():            Reset integral accumulator to 0
+                    process(errors):    Update controller with array of
+                                            samples
     """
-    def __init__(self,pCoeff,iCoeff,maxVal):
-        self.pCoefff = pCoeff
+    # Min # of samples per anti-windup cumsum window
+    __MIN_WIN = 16
+    # Limit crossings closer than DENSE_RUN samples switch anti-windup to
+    # the scalar loop for the next SCALAR_LEN samples
+    __DENSE_RUN = 64
+    __SCALAR_LEN = 1024
+
+    def __init__(self,pCoeff,iCoeff,maxVal,antiWindup=False):
+        self.pCoeff = pCoeff
         self.iCoeff = iCoeff
         self.maxVal = maxVal
+        self.antiWindup = antiWindup
         self.__accum = 0
 
     def update(self,sampIn):
@@ -27,9 +40,19 @@ class PICtrl():
 
         Returns:        sampOut:    Output sample
         """
-        self.__accum += sampIn*self.iCoeff
-        sampOut = sampIn*self.pCoeff + self.__accum
-        sampOut = np.clip(sampOut,-self.maxVal,self.maxVal)
+        # Scalar path kept free of NumPy calls
+        accum = self.__accum + sampIn*self.iCoeff
+        if (self.antiWindup == True):
+            if (accum > self.maxVal):
+                accum = self.maxVal
+            elif (accum < -self.maxVal):
+                accum = -self.maxVal
+        self.__accum = accum
+        sampOut = sampIn*self.pCoeff + accum
+        if (sampOut > self.maxVal):
+            sampOut = self.maxVal
+        elif (sampOut < -self.maxVal):
+            sampOut = -self.maxVal
         return sampOut
 
     def clear(self):
@@ -40,4 +63,102 @@ class PICtrl():
 
         Returns:        None
         """
-        self.__accum = 0
\ No newline at end of file
+        self.__accum = 0
+
+    def process(self,errors):
+        """
+        Description:    Update controller with an array of samples (e.g. a
+                            known error signal). Integral is computed with a
+                            cumulative sum. Accumulator is carried between
+                            calls. Output matches calling update() on each
+                            sample.
+
+        Params:         errors:     Input sample array
+
+        Returns:        dataOut:    Output sample array
+        """
+        errors = np.asarray(errors)
+        incr = errors*self.iCoeff
+        if (self.antiWindup == True):
+            accum = self.__clampedSum(incr)
+        else:
+            accum = self.__accum + np.cumsum(incr)
+        if (accum.size > 0):
+            self.__accum = accum[-1]
+        dataOut = np.clip(errors*self.pCoeff + accum,-self.maxVal,self.maxVal)
+        return dataOut
+
+    def __clampedSum(self,incr):
+        # Running sum clamped at +/- maxVal. While only one limit is hit the
+        # clamped sum is a one-sided reflection of the plain cumsum (cumsum
+        # minus its running max excess over the limit), so a new cumsum is
+        # only needed when the sum crosses from one limit to the other.
+        # Windows are sized from the last run between crossings and double
+        # while no crossing is found. Dense crossings (limit cycling) are
+        # cheaper one sample at a time.
+        hi = float(self.maxVal)
+        lo = -hi
+        accum = np.empty(incr.size)
+        sumVal = float(self.__accum)
+        upper = True
+        ind = 0
+        winLen = self.__MIN_WIN
+        while (ind < incr.size):
+            if (winLen == 0):
+                # Scalar run. Starting in upper mode is valid from any sum
+                # within limits (mode only changes on a crossing).
+                end = min(ind+self.__SCALAR_LEN,incr.size)
+                run = incr[ind:end].tolist()
+                for ii in range(len(run)):
+                    sumVal = min(max(sumVal + run[ii],lo),hi)
+                    run[ii] = sumVal
+                accum[ind:end] = run
+                ind = end
+                upper = True
+                winLen = self.__MIN_WIN
+                continue
+            seg = np.cumsum(incr[ind:ind+winLen]) + sumVal
+            if (upper == True):
+                seg -= np.maximum(np.maximum.accumulate(seg - hi),0)
+                cross = seg < lo
+            else:
+                seg -= np.minimum(np.minimum.accumulate(seg - lo),0)
+                cross = seg > hi
+            numOk = int(np.argmax(cross)) if cross.any() else seg.size
+            accum[ind:ind+numOk] = seg[0:numOk]
+            if (numOk < seg.size):
+                # Clamped at the other limit, which is now the active one
+                sumVal = lo if (upper == True) else hi
+                accum[ind+numOk] = sumVal
+                upper = not upper
+                ind += numOk+1
+                if (numOk < self.__DENSE_RUN):
+                    winLen = 0
+                else:
+                    winLen = 2*numOk
+            else:
+                sumVal = seg[-1]
+                ind += numOk
+                winLen *= 2
+        return accum
+
+"""
+# EXAMPLE:
+import time
+# Mostly saturated, then limit cycling every 2 and every 32 samples
+errs = [np.random.randn(1000000)*0.5 + 0.1,
+        np.tile([10.0,-10.0],100000),
+        np.tile(np.repeat([10.0,-10.0],32),3125)]
+for err in errs:
+    ctrl = PICtrl(0.5,0.01,2,antiWindup=True)
+    if (err[0] == 10):
+        ctrl.iCoeff = 1
+    t = time.time()
+    out = ctrl.process(err)
+    tBlock = time.time()-t
+    ctrl.clear()
+    t = time.time()
+    outRef = np.array([ctrl.update(x) for x in err])
+    tLoop = time.time()-t
+    print(np.max(np.abs(out-outRef)),tBlock,tLoop)
+"""
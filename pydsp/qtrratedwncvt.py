@@ -1,4 +1,5 @@
 import numpy as np
+from .fir import FIR
 
 class QtrRateDwnCvt():
     """
@@ -7,14 +8,33 @@ class QtrRateDwnCvt():
     Description:    Implements Quarter Rate Down Converter. Multiplies input 
                         by sin/cos waveforms of frequency = 1/4*fSamp.
     
-    Attributes:     None
+    Attributes:     phase:  Index into sin/cos phase pattern
+                    inFmt:  (*optional) FixedPt input format. Default = None
+                    outFmt: (*optional) FixedPt output format (catches
+                                negation of the most negative input).
+                                Default = None (floating point)
+                    decimTaps:  (*optional) Half-band (or other) lowpass taps
+                                    for the fused decimate-by-2 stage of
+                                    process(). Default = None (no filter)
                     
     Methods:        update(sampIn):     Apply Qtr Rate function to input
                     clear():            Reset sin/cos phases
+                    process(data):      Apply Qtr Rate function to data block
     """
-    def __init__(self):
-        self.cosPhase = np.array([1,0,-1,0])
-        self.sinPhase = np.array([0,1,0,-1])
+    COS_PHASE = np.array([1,0,-1,0])
+    SIN_PHASE = np.array([0,1,0,-1])
+
+    def __init__(self,inFmt=None,outFmt=None,decimTaps=None):
+        self.phase = 0
+        self.inFmt = inFmt
+        self.outFmt = outFmt
+        self.decimTaps = decimTaps
+        if (decimTaps is not None):
+            # I is only nonzero on even samples and Q on odd samples, so
+            # each sees only the even or odd polyphase taps
+            self.__firI = FIR(decimTaps[0::2],method='direct')
+            self.__firQ = FIR(decimTaps[1::2],method='direct')
+        self.__qPend = np.zeros(1)
 
     def update(self,sampIn):
         """
@@ -25,10 +45,14 @@ class QtrRateDwnCvt():
         Returns:        iOut:       Input*cos(phase)
                         qOut:       Input*sin(phase)
         """
-        iOut = sampIn*self.cosPhase[0]
-        qOut = sampIn*self.sinPhase[0]
-        self.cosPhase = np.roll(self.cosPhase,-1)
-        self.sinPhase = np.roll(self.sinPhase,-1)
+        if (self.inFmt is not None):
+            sampIn = self.inFmt.quantize(sampIn)
+        iOut = sampIn*self.COS_PHASE[self.phase]
+        qOut = sampIn*self.SIN_PHASE[self.phase]
+        self.phase = (self.phase + 1) & 3
+        if (self.outFmt is not None):
+            iOut = self.outFmt.quantize(iOut)
+            qOut = self.outFmt.quantize(qOut)
         return iOut,qOut
 
     def clear(self):
@@ -39,8 +63,85 @@ class QtrRateDwnCvt():
 
         Returns:        None
         """
-        self.cosPhase = np.array([1,0,-1,0])
-        self.sinPhase = np.array([0,1,0,-1])
+        self.phase = 0
+        if (self.decimTaps is not None):
+            self.__firI.clear()
+            self.__firQ.clear()
+        self.__qPend = np.zeros(1)
+
+    def process(self,data,decim=False,complexOut=False):
+        """
+        Description:    Apply Qtr Rate function to a block of data using sign
+                            flips and strided slicing. Phase is carried
+                            between calls. With decim set, the known zero
+                            I/Q samples are skipped: I holds the even and Q
+                            the odd input samples at half rate. Q is delayed
+                            one input sample so each output pairs I from
+                            even sample n with Q from odd sample n-1 (first
+                            Q is 0); an unpaired Q is carried to the next
+                            call, so I and Q always have equal lengths. If
+                            decimTaps was given, both are also lowpass
+                            filtered, matching FIR(decimTaps) on the full
+                            rate I/Q followed by keeping even samples.
+
+        Params:         data:       Input data block
+                        decim:      (*optional) Set to True to decimate by 2.
+                                        Default = False
+                        complexOut: (*optional) Set to True to return
+                                        iOut + 1j*qOut. Default = False
+
+        Returns:        iOut:       Input*cos(phase)
+                        qOut:       Input*sin(phase)
+                            (or single complex array if complexOut)
+        """
+        data = np.asarray(data)
+        if (self.inFmt is not None):
+            data = self.inFmt.quantize(data)
+        if (decim == True):
+            iOut,qOut = self.__mixDecim(data)
+        else:
+            iOut,qOut = self.__mix(data)
+        self.phase = (self.phase + data.size) & 3
+        if (self.outFmt is not None):
+            iOut = self.outFmt.quantize(iOut)
+            qOut = self.outFmt.quantize(qOut)
+        if (decim == True):
+            if (self.decimTaps is not None):
+                iOut = self.__firI.process(iOut)
+                qOut = self.__firQ.process(qOut)
+            # Q output at even sample n uses Q from odd sample n-1
+            qSeq = np.concatenate((self.__qPend.astype(qOut.dtype),qOut))
+            qOut = qSeq[0:iOut.size]
+            self.__qPend = qSeq[iOut.size:]
+        if (complexOut == True):
+            return iOut + 1j*qOut
+        return iOut,qOut
+
+    def __mix(self,data):
+        iOut = np.zeros_like(data)
+        qOut = np.zeros_like(data)
+        # Offset into block of first sample at each phase
+        st = [(k - self.phase) & 3 for k in range(0,4)]
+        iOut[st[0]::4] = data[st[0]::4]
+        iOut[st[2]::4] = -data[st[2]::4]
+        qOut[st[1]::4] = data[st[1]::4]
+        qOut[st[3]::4] = -data[st[3]::4]
+        return iOut,qOut
+
+    def __mixDecim(self,data):
+        stEven = self.phase & 1
+        iOut = data[stEven::2].copy()
+        qOut = data[1-stEven::2].copy()
+        # Every other kept sample is negated (cos/sin = -1 phases)
+        if (((self.phase + stEven) & 3) == 0):
+            iOut[1::2] = -iOut[1::2]
+        else:
+            iOut[0::2] = -iOut[0::2]
+        if (((self.phase + 1 - stEven) & 3) == 1):
+            qOut[1::2] = -qOut[1::2]
+        else:
+            qOut[0::2] = -qOut[0::2]
+        return iOut,qOut
 
 """
 # EXAMPLE:
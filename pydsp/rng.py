@@ -0,0 +1,40 @@
+import numpy as np
+
+def makeRng(seed=None):
+    """
+    Description:    Get numpy random Generator from seed. Generators are
+                        passed through unchanged so streams can be shared.
+
+    Params:         seed:       (*optional) int, SeedSequence or Generator.
+                                    Default = None (fresh OS entropy)
+
+    Returns:        rng:        numpy.random.Generator
+    """
+    if isinstance(seed,np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+def spawn(seed,numChild):
+    """
+    Description:    Get statistically independent child Generators, e.g. one
+                        per worker process of a Monte Carlo run. Children
+                        are reproducible from seed.
+
+    Params:         seed:       int, SeedSequence or Generator
+                    numChild:   # of child Generators
+
+    Returns:        rngs:       List of numChild numpy.random.Generator
+    """
+    if isinstance(seed,np.random.Generator):
+        return seed.spawn(numChild)
+    if not isinstance(seed,np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed.spawn(numChild)]
+
+"""
+# EXAMPLE:
+from noisegen import AWGN
+rngs = spawn(1234,4)
+noiseGens = [AWGN(.70710678,10,seed=rng) for rng in rngs]
+print([gen.getNoise(3) for gen in noiseGens])
+"""